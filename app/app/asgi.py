@@ -7,10 +7,20 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
+import atexit
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('ASYNC_API', '1')
 
 application = get_asgi_application()
+
+from core.startup import close_databases, warm_databases, warm_up  # noqa: E402
+
+# load the views and serializers, and open the connection pool, before the
+# first request; uvicorn imports this in each worker process
+warm_up()
+warm_databases()
+atexit.register(close_databases)
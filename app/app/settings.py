@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its total covers the other middleware
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +62,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'app.urls'
 
+# Share of requests timed and reported in a Server-Timing header and a log
+# line on the core.timing logger (0 turns it off, 1 times every request)
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0.01))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -78,6 +84,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Serve recipe API reads with async views (set by app/asgi.py)
+ASYNC_API = bool(int(os.environ.get("ASYNC_API", 0)))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -89,9 +98,79 @@ DATABASES = {
         'NAME': os.environ.get("DB_NAME"),
         'USER': os.environ.get("DB_USER"),
         'PASSWORD': os.environ.get("DB_PASS"),
+        # reuse a worker's connection across requests, checking it is still
+        # alive first; the async server uses the pool below instead
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if ASYNC_API else 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# DB_POOL=1 gives each app process a psycopg 3 connection pool shared by
+# its threads; Django uses psycopg 3 instead of psycopg2 when both are
+# installed. Pools are opened after the server forks and closed when a
+# worker exits, so recycled workers release their connections.
+if bool(int(os.environ.get('DB_POOL', 0))):
+    # the pool keeps the connections open
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+            # seconds a request waits for a free connection
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # replace connections before a proxy or Postgres drops them
+            'max_lifetime': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        },
+    }
+
+# Read replicas for safe API requests: DB_REPLICAS="host[=weight],..." adds
+# the aliases replica1, replica2, ... with the primary's other settings.
+DATABASE_REPLICAS = {}
+for number, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1,
+):
+    host, _, weight = replica.partition('=')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {
+            **DATABASES['default'].get('OPTIONS', {}),
+            # give up on a dead replica quickly and fall back to the primary
+            'connect_timeout': int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2)),
+        },
+        # tests read the test database through the replica aliases
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS[f'replica{number}'] = int(weight or 1)
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# replicas lagging more than this many seconds are skipped; users read from
+# the primary for DB_REPLICA_STICKY_SECONDS after a write, which must be
+# longer than the lag allowed
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+DB_REPLICA_CHECK_INTERVAL = int(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5))
+
+# /readyz queries the database at most once per this many seconds
+READINESS_CHECK_INTERVAL = int(os.environ.get('READINESS_CHECK_INTERVAL', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+if os.environ.get("REDIS_URL"):
+    # shared by every uwsgi worker and container
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get("REDIS_URL"),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -111,6 +190,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Passwords are hashed inline, or in a pool of PASSWORD_HASH_WORKERS worker
+# processes per app process, which only frees the thread under ASGI. A hash
+# that would wait behind PASSWORD_HASH_QUEUE others in the process, or
+# PASSWORD_HASH_MAX_CONCURRENT others in all processes sharing the cache
+# (0 for no limit), gets 503 with Retry-After instead.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_MAX_CONCURRENT = int(os.environ.get('PASSWORD_HASH_MAX_CONCURRENT', 4))
+PASSWORD_HASH_CACHE_ALIAS = 'default'
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -133,6 +223,24 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Precomputed OpenAPI schema files, written by the build_schema command
+OPENAPI_SCHEMA_ROOT = '/vol/web/schema'
+
+# Resized variants of recipe images: name -> (max side in px, format)
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (200, 'JPEG'),
+    'medium': (800, 'JPEG'),
+    'thumbnail_webp': (200, 'WEBP'),
+    'medium_webp': (800, 'WEBP'),
+}
+IMAGE_RENDITION_WORKERS = int(os.environ.get('IMAGE_RENDITION_WORKERS', 2))
+
+# Limits checked from the image header before any pixels are decoded
+RECIPE_IMAGE_FORMATS = os.environ.get('RECIPE_IMAGE_FORMATS', 'JPEG,PNG,WEBP').split(',')
+RECIPE_IMAGE_MAX_BYTES = int(os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+RECIPE_IMAGE_MAX_DIMENSION = int(os.environ.get('RECIPE_IMAGE_MAX_DIMENSION', 8000))
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -145,6 +253,35 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_LOCAL_TTL = int(os.environ.get('TOKEN_CACHE_LOCAL_TTL', 30))
+TOKEN_CACHE_MAXSIZE = int(os.environ.get('TOKEN_CACHE_MAXSIZE', 10000))
+
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000))
+
+RECIPE_PAGE_SIZE = int(os.environ.get('RECIPE_PAGE_SIZE', 100))
+RECIPE_MAX_PAGE_SIZE = int(os.environ.get('RECIPE_MAX_PAGE_SIZE', 500))
+
+RECIPE_FILTER_MAX_IDS = int(os.environ.get('RECIPE_FILTER_MAX_IDS', 100))
+
+# Tag/ingredient autocomplete: results per request, and the in-process
+# prefix indexes (users kept, seconds kept, most items per user)
+AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT', 10))
+AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get('AUTOCOMPLETE_MAX_LIMIT', 50))
+AUTOCOMPLETE_CACHE_USERS = int(os.environ.get('AUTOCOMPLETE_CACHE_USERS', 1000))
+AUTOCOMPLETE_CACHE_TTL = int(os.environ.get('AUTOCOMPLETE_CACHE_TTL', 600))
+AUTOCOMPLETE_MAX_ITEMS = int(os.environ.get('AUTOCOMPLETE_MAX_ITEMS', 5000))
+
+# Full-text search (PostgreSQL); changing these needs the documents rebuilt
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+RECIPE_SEARCH_INCLUDE_LINKS = bool(int(os.environ.get('RECIPE_SEARCH_INCLUDE_LINKS', 1)))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
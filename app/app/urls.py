@@ -14,16 +14,25 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
 from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core import views as core_views
+
+# under ASGI the probes answer without waiting for the sync view thread
+if settings.ASYNC_API:
+    healthz, readyz = core_views.ahealthz, core_views.areadyz
+else:
+    healthz, readyz = core_views.healthz, core_views.readyz
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(),name='api-schema'),
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
+    path('api/schema/', core_views.CachedSchemaView.as_view(),name='api-schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'),name='api-docs'),
     path('api/users/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 """
 
+import atexit
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,20 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+from core.startup import close_databases, warm_databases, warm_up  # noqa: E402
+
+# load the views and serializers now; under uwsgi this runs in the master,
+# so every worker forks with them loaded
+warm_up()
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    pass
+else:
+    # connections must not be shared with the master, so open them per worker
+    postfork(warm_databases)
+
+# workers recycled by uwsgi (--max-requests) disconnect cleanly
+atexit.register(close_databases)
@@ -0,0 +1,91 @@
+"""Content-addressed file storage for uploaded images."""
+import hashlib
+import os
+import threading
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(file):
+    """Return the SHA-256 hex digest of a file.
+
+    Uploads streamed through HashingUploadHandler already carry the digest;
+    other files are read in chunks and rewound.
+    """
+    digest = getattr(file, 'content_hash', None)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    for chunk in File(file).chunks():
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file, hashing them as they arrive."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.sha.hexdigest()
+        return file
+
+
+@deconstructible(path='core.files.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage where a name identifies its content.
+
+    Saving a name that already exists keeps the stored file instead of
+    writing a copy, so identical uploads share one file. The stored file is
+    touched so a concurrent release() does not delete it while the new
+    reference is being committed.
+    """
+
+    # how long a reused file is protected from deletion
+    reuse_grace = 60
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saving = threading.local()
+
+    def get_available_name(self, name, max_length=None):
+        if getattr(self._saving, 'active', False):
+            # FileSystemStorage._save() found the name taken and asks for
+            # another one; the file has the same content, so stop there
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        self._saving.active = True
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # an identical upload was saved since exists() was checked
+            os.utime(self.path(name))
+            return name
+        finally:
+            self._saving.active = False
+
+    def recently_used(self, name):
+        """Return True if the file was written or reused in the grace period."""
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return modified > time.time() - self.reuse_grace
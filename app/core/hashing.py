@@ -0,0 +1,233 @@
+"""Bounded password hashing, optionally on a process pool.
+
+PBKDF2 is slow on purpose, so a burst of logins can hold every worker. A
+hash that would wait behind ``PASSWORD_HASH_QUEUE`` others in this
+process, or behind ``PASSWORD_HASH_MAX_CONCURRENT`` others across every
+process sharing the cache, is refused with 503 and Retry-After rather
+than queued. With ``PASSWORD_HASH_WORKERS`` set, hashes run in a small
+pool of worker processes, which async views await without holding the
+event loop; sync views still wait for theirs.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+PENDING_KEY = 'auth:hashing'
+# slots held by a process killed mid-hash come back when the key expires,
+# PENDING_TIMEOUT seconds after the last hash was admitted
+PENDING_TIMEOUT = 60
+
+_lock = threading.Lock()
+_pool = None
+_pending = 0
+
+
+class PasswordHashingBusy(APIException):
+    """Too many password hashes are already waiting."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress, try again shortly.'
+    default_code = 'password_hashing_busy'
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        # sent as Retry-After by the DRF exception handler
+        self.wait = settings.PASSWORD_HASH_RETRY_AFTER
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # created on first use, so each uwsgi worker gets its own;
+            # forking this threaded process could copy a lock another
+            # thread holds, so workers start from a fork server
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(
+                settings.PASSWORD_HASH_WORKERS, mp_context=context,
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    """Drop a pool whose worker died so the next hash starts a new one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _take_local_slot():
+    global _pending
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_QUEUE:
+            raise PasswordHashingBusy()
+        _pending += 1
+
+
+def _free_local_slot():
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _shared_cache():
+    return caches[settings.PASSWORD_HASH_CACHE_ALIAS]
+
+
+@contextmanager
+def _admitted():
+    """Hold a hashing slot, or raise PasswordHashingBusy."""
+    _take_local_slot()
+    shared = False
+    try:
+        limit = settings.PASSWORD_HASH_MAX_CONCURRENT
+        if limit:
+            pending = _take_shared(_shared_cache())
+            shared = pending is not None
+            if shared and pending > limit:
+                raise PasswordHashingBusy()
+        yield
+    finally:
+        if shared:
+            _release_shared(_shared_cache())
+        _free_local_slot()
+
+
+@asynccontextmanager
+async def _aadmitted():
+    """Async counterpart of _admitted()."""
+    _take_local_slot()
+    shared = False
+    try:
+        limit = settings.PASSWORD_HASH_MAX_CONCURRENT
+        if limit:
+            pending = await _atake_shared(_shared_cache())
+            shared = pending is not None
+            if shared and pending > limit:
+                raise PasswordHashingBusy()
+        yield
+    finally:
+        if shared:
+            await _arelease_shared(_shared_cache())
+        _free_local_slot()
+
+
+def _take_shared(cache):
+    """Count a hash in the shared counter and return the new count.
+
+    Returns None if the key expired in between; the hash then goes
+    through uncounted.
+    """
+    cache.add(PENDING_KEY, 0, timeout=PENDING_TIMEOUT)
+    try:
+        pending = cache.incr(PENDING_KEY)
+    except ValueError:
+        return None
+    # incr() keeps the expiry set when the key was added; push it back so
+    # the count is not reset to 0 under steady load while hashes still run
+    cache.touch(PENDING_KEY, PENDING_TIMEOUT)
+    return pending
+
+
+async def _atake_shared(cache):
+    """Async counterpart of _take_shared()."""
+    await cache.aadd(PENDING_KEY, 0, timeout=PENDING_TIMEOUT)
+    try:
+        pending = await cache.aincr(PENDING_KEY)
+    except ValueError:
+        return None
+    await cache.atouch(PENDING_KEY, PENDING_TIMEOUT)
+    return pending
+
+
+def _release_shared(cache):
+    try:
+        pending = cache.decr(PENDING_KEY)
+        if pending < 0:
+            # the key expired and was added again while this hash ran
+            cache.incr(PENDING_KEY, -pending)
+    except ValueError:
+        pass
+
+
+async def _arelease_shared(cache):
+    try:
+        pending = await cache.adecr(PENDING_KEY)
+        if pending < 0:
+            await cache.aincr(PENDING_KEY, -pending)
+    except ValueError:
+        pass
+
+
+def _run(func, *args):
+    if not settings.PASSWORD_HASH_WORKERS:
+        return func(*args)
+    pool = _get_pool()
+    try:
+        return pool.submit(func, *args).result()
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise PasswordHashingBusy()
+
+
+async def _arun(func, *args):
+    if not settings.PASSWORD_HASH_WORKERS:
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+    pool = _get_pool()
+    try:
+        return await asyncio.wrap_future(pool.submit(func, *args))
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise PasswordHashingBusy()
+
+
+def make_password(password):
+    """Hash ``password`` for storage, like hashers.make_password()."""
+    if password is None:
+        # an unusable password is random text, not a hash
+        return hashers.make_password(None)
+    with _admitted():
+        return _run(hashers.make_password, password)
+
+
+async def amake_password(password):
+    """Async counterpart of make_password()."""
+    if password is None:
+        return hashers.make_password(None)
+    async with _aadmitted():
+        return await _arun(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """Return whether ``password`` matches ``encoded``, like
+    hashers.check_password(); ``setter`` is called to upgrade old hashes."""
+    with _admitted():
+        is_correct, must_update = _run(hashers.verify_password, password, encoded)
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
+
+
+async def acheck_password(password, encoded, setter=None):
+    """Async counterpart of check_password(); ``setter`` is a coroutine."""
+    async with _aadmitted():
+        is_correct, must_update = await _arun(
+            hashers.verify_password, password, encoded,
+        )
+    if setter and is_correct and must_update:
+        await setter(password)
+    return is_correct
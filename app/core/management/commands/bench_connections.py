@@ -0,0 +1,78 @@
+"""
+django command to benchmark request latency with and without connection reuse
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    """Django command to compare per-request latency of connection setups.
+
+    Sends GET /readyz, which runs one query, through the full Django stack,
+    first opening a new connection for every request and then with the
+    configured CONN_MAX_AGE or pool. Connections are closed around each
+    request the way the request handler does it, which the test client
+    otherwise skips.
+    """
+    help = 'Benchmark request latency with and without database connection reuse.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        # /readyz queries the default database
+        connection = connections[DEFAULT_DB_ALIAS]
+        settings_dict = connection.settings_dict
+        configured = {
+            'CONN_MAX_AGE': settings_dict['CONN_MAX_AGE'],
+            'OPTIONS': settings_dict['OPTIONS'],
+        }
+        if settings_dict['OPTIONS'].get('pool'):
+            label = 'pooled'
+        else:
+            label = f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+
+        results = []
+        try:
+            settings_dict['CONN_MAX_AGE'] = 0
+            settings_dict['OPTIONS'] = {
+                name: value
+                for name, value in configured['OPTIONS'].items()
+                if name != 'pool'
+            }
+            connection.close()
+            results.append(('new connection', self._measure(options['requests'])))
+        finally:
+            settings_dict.update(configured)
+            connection.close()
+        results.append((label, self._measure(options['requests'])))
+        connection.close()
+
+        baseline = statistics.median(results[0][1])
+        for name, timings in results:
+            median = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(
+                f'{name}: median {median:.2f} ms, p95 {p95:.2f} ms '
+                f'({median - baseline:+.2f} ms)'
+            )
+
+    @override_settings(READINESS_CHECK_INTERVAL=0)
+    def _measure(self, requests):
+        """Return the latency of each request in milliseconds."""
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('readyz')
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            close_old_connections()
+            client.get(url)
+            close_old_connections()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,33 @@
+"""
+django command to precompute the OpenAPI schema
+"""
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to write the schema served at /api/schema/.
+
+    Does nothing if the files for the current code fingerprint exist,
+    unless --force is given.
+    """
+    help = 'Generate the OpenAPI schema files served by the API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='regenerate even if the schema is up to date',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if not options['force'] and schema.load_schema() is not None:
+            self.stdout.write('schema up to date, skipping')
+            return
+
+        schema.save_schema(schema.generate_schema())
+        self.stdout.write(self.style.SUCCESS(
+            f"Schema written to {schema.schema_path('yaml')}"
+        ))
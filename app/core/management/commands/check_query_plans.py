@@ -0,0 +1,121 @@
+"""
+django command to check the hot queries are served by their indexes
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models.functions import Lower
+
+from core.models import Ingredient, Recipe, Tag
+
+# plan text showing rows were sorted instead of read in index order
+SORT_MARKERS = {
+    'postgresql': 'Sort',
+    'sqlite': 'TEMP B-TREE',
+}
+
+# (description, index that must serve it, queryset); ids are placeholders
+HOT_QUERIES = (
+    (
+        'recipe list page',
+        'core_recipe_user_id_idx',
+        lambda: Recipe.objects.filter(user_id=1).order_by('-id')[:100],
+    ),
+    (
+        'recipe list next page',
+        'core_recipe_user_id_idx',
+        lambda: Recipe.objects.filter(user_id=1, id__lt=1000).order_by('-id')[:100],
+    ),
+    (
+        'tag list',
+        'core_tag_user_name_uniq',
+        lambda: Tag.objects.filter(user_id=1).order_by('-name'),
+    ),
+    (
+        'tags by name',
+        'core_tag_user_name_uniq',
+        lambda: Tag.objects.filter(user_id=1, name__in=['a', 'b']),
+    ),
+    (
+        'ingredient list',
+        'core_ingredient_user_name_uniq',
+        lambda: Ingredient.objects.filter(user_id=1).order_by('-name'),
+    ),
+    (
+        'ingredients by name',
+        'core_ingredient_user_name_uniq',
+        lambda: Ingredient.objects.filter(user_id=1, name__in=['a', 'b']),
+    ),
+    (
+        'tag autocomplete',
+        'core_tag_lname_idx',
+        lambda: Tag.objects.filter(user_id=1).alias(
+            lower_name=Lower('name'),
+        ).filter(lower_name__startswith='ve'),
+    ),
+    (
+        'ingredient autocomplete',
+        'core_ingredient_lname_idx',
+        lambda: Ingredient.objects.filter(user_id=1).alias(
+            lower_name=Lower('name'),
+        ).filter(lower_name__startswith='ve'),
+    ),
+)
+
+
+def plan_names(connection, table, index):
+    """Return the names ``index`` can appear under in a query plan.
+
+    SQLite backs UNIQUE constraints kept in the table definition, as left
+    by its table rebuilds, with indexes named sqlite_autoindex_<table>_N.
+    """
+    names = [index]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        if constraints.get(index, {}).get('unique'):
+            names.append(f'sqlite_autoindex_{table}_')
+    return names
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN the hot queries.
+
+    Fails if a query is not planned on its index or needs a sort. On
+    PostgreSQL sequential scans are disabled for the check, so it verifies
+    the indexes are usable even while the tables are too small for the
+    planner to prefer them.
+    """
+    help = 'Check the hot queries use their indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        connection = connections[options['database']]
+        sort_marker = SORT_MARKERS.get(connection.vendor)
+        if sort_marker is None:
+            raise CommandError(f'{connection.vendor} is not supported.')
+
+        failed = []
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for description, index, queryset in HOT_QUERIES:
+                queryset = queryset().using(connection.alias)
+                names = plan_names(connection, queryset.model._meta.db_table, index)
+                plan = queryset.explain()
+                if not any(name in plan for name in names):
+                    failed.append(description)
+                    self.stderr.write(f'{description}: not using {index}\n{plan}')
+                elif sort_marker in plan:
+                    failed.append(description)
+                    self.stderr.write(f'{description}: sorts rows\n{plan}')
+                else:
+                    self.stdout.write(f'{description}: uses {index}')
+
+        if failed:
+            raise CommandError(f'{len(failed)} queries miss their index.')
+        self.stdout.write(self.style.SUCCESS('All hot queries use their indexes.'))
@@ -0,0 +1,237 @@
+"""
+django command to import recipes from JSON Lines
+"""
+import csv
+import io
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import ImportCheckpoint, Recipe
+from recipe import bulk
+from recipe.cache import bump_data_version
+from recipe.search import update_search_vectors
+from recipe.serializers import RecipeSerializer
+
+RECIPE_FIELDS = ('title', 'description', 'time_minutes', 'price', 'link')
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes.
+
+    Every line is a recipe in the API format, optionally with a "user"
+    email. Rows are written in batches with bulk inserts, tags and
+    ingredients are deduplicated per user in memory, and with --job the
+    last imported line is saved in the same transaction as each batch so
+    a rerun resumes exactly where a crashed run stopped.
+    """
+    help = 'Import recipes from a JSON Lines file or stdin.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON Lines file, or '-' for stdin")
+        parser.add_argument(
+            '--user',
+            help='email of the owner of rows without a "user" key',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--job',
+            help='name to save progress under; rerunning resumes the job',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='load rows with PostgreSQL COPY instead of INSERT',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+
+        self.options = options
+        self.users = {}
+        self.names = {}
+        self.imported = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+        start = 0
+        if options['job']:
+            checkpoint, created = ImportCheckpoint.objects.get_or_create(
+                name=options['job'],
+            )
+            start = checkpoint.line
+            if start:
+                self.stdout.write(f'resuming after line {start}')
+
+        stream = sys.stdin if options['path'] == '-' else open(
+            options['path'], encoding='utf-8',
+        )
+        try:
+            batch = []
+            for number, line in enumerate(stream, start=1):
+                if number <= start or not line.strip():
+                    continue
+                batch.append((number, line))
+                if len(batch) >= options['batch_size']:
+                    self._import_batch(batch)
+                    batch = []
+            if batch:
+                self._import_batch(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} recipes, skipped {self.skipped}.'
+        ))
+
+    def _skip(self, number, error):
+        self.skipped += 1
+        self.stderr.write(f'line {number}: {error}')
+
+    def _load_users(self, emails):
+        """Resolve owner emails not seen yet in one query."""
+        missing = {email for email in emails if email not in self.users}
+        if missing:
+            for user in get_user_model().objects.filter(email__in=missing):
+                self.users[user.email] = user
+
+    def _parse(self, batch):
+        """Return (user, validated_data) for the valid lines of a batch."""
+        parsed = []
+        for number, line in batch:
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                self._skip(number, f'invalid JSON ({exc})')
+                continue
+            if not isinstance(data, dict):
+                self._skip(number, 'expected a JSON object')
+                continue
+            parsed.append((number, data.pop('user', self.options['user']), data))
+
+        self._load_users(email for number, email, data in parsed)
+
+        rows = []
+        for number, email, data in parsed:
+            user = self.users.get(email)
+            if user is None:
+                self._skip(number, f'unknown user {email!r}')
+                continue
+            serializer = RecipeSerializer(data=data)
+            if not serializer.is_valid():
+                self._skip(number, serializer.errors)
+                continue
+            rows.append((user, serializer.validated_data))
+        return rows
+
+    def _import_batch(self, batch):
+        rows = self._parse(batch)
+        with transaction.atomic():
+            if rows:
+                self._write(rows)
+            if self.options['job']:
+                ImportCheckpoint.objects.filter(
+                    name=self.options['job'],
+                ).update(line=batch[-1][0])
+            for user_id in {user.id for user, data in rows}:
+                bump_data_version(user_id)
+
+        self.imported += len(rows)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'line {batch[-1][0]}: {self.imported} imported, '
+            f'{self.skipped} skipped ({self.imported / max(elapsed, 1e-6):.0f}/s)'
+        )
+
+    def _write(self, rows):
+        recipes = [
+            Recipe(
+                user=user,
+                **{name: data[name] for name in RECIPE_FIELDS if name in data},
+            )
+            for user, data in rows
+        ]
+        if self.options['copy']:
+            self._copy_recipes(recipes)
+        else:
+            Recipe.objects.bulk_create(recipes)
+
+        for field_name, model in bulk.RECIPE_LINKS:
+            missing = defaultdict(list)
+            for user, data in rows:
+                for item in data.get(field_name, []):
+                    if (model, user.id, item['name']) not in self.names:
+                        missing[user].append(item['name'])
+            for user, names in missing.items():
+                objs = bulk.get_or_create_by_name(model, user, names)
+                for name, obj in objs.items():
+                    self.names[(model, user.id, name)] = obj.id
+
+            links = [
+                (recipe.id, self.names[(model, user.id, item['name'])])
+                for recipe, (user, data) in zip(recipes, rows)
+                for item in data.get(field_name, [])
+            ]
+            if self.options['copy']:
+                self._copy_links(field_name, links)
+            else:
+                bulk.add_recipe_links(field_name, links)
+
+        update_search_vectors([recipe.id for recipe in recipes])
+
+    def _copy(self, table, columns, rows):
+        """Load rows into a table with COPY ... FROM STDIN."""
+        buffer = io.StringIO()
+        # quote everything so empty strings are not read as NULL
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        sql = (
+            f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        # Django uses psycopg 3 whenever it is installed, psycopg2 otherwise
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        with connection.cursor() as cursor:
+            if is_psycopg3:
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                cursor.copy_expert(sql, buffer)
+
+    def _copy_recipes(self, recipes):
+        """COPY recipes in, reserving their ids from the sequence first."""
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [table, len(recipes)],
+            )
+            for recipe, (recipe_id,) in zip(recipes, cursor.fetchall()):
+                recipe.id = recipe_id
+
+        fields = [Recipe._meta.get_field(name) for name in ('id', 'user', *RECIPE_FIELDS)]
+        self._copy(
+            table,
+            [field.column for field in fields],
+            [[getattr(recipe, field.attname) for field in fields] for recipe in recipes],
+        )
+
+    def _copy_links(self, field_name, links):
+        """COPY (recipe_id, obj_id) rows into a Recipe M2M table."""
+        through, source, target = bulk.recipe_through(field_name)
+        links = dict.fromkeys(links)
+        self._copy(through._meta.db_table, [source, target], links)
+        bulk.adjust_recipe_counts(
+            field_name, Counter(obj_id for recipe_id, obj_id in links),
+        )
@@ -0,0 +1,32 @@
+"""
+django command to render the missing renditions of recipe images
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.renditions import render_recipe_image
+
+
+class Command(BaseCommand):
+    """Django command to render renditions lost with their background job.
+
+    Renditions are rendered on an in-process thread pool after the upload
+    commits, so a job is lost when its worker exits first. Recipes with an
+    image but no renditions are rendered again here, inline; renditions
+    that already exist in storage are reused.
+    """
+    help = 'Render the renditions of recipe images that have none.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        missing = (
+            Recipe.objects.filter(renditions__isnull=True)
+            .exclude(image__isnull=True)
+            .exclude(image='')
+            .values_list('id', 'user_id', 'image')
+        )
+        rendered = 0
+        for recipe_id, user_id, name in missing.iterator():
+            render_recipe_image(recipe_id, user_id, name)
+            rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} recipe images.'))
@@ -0,0 +1,42 @@
+"""
+django command to recompute the recipe counts of tags and ingredients
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from recipe import bulk
+
+
+class Command(BaseCommand):
+    """Django command to repair Tag/Ingredient.recipe_count.
+
+    The counts are recomputed from the M2M tables with one set-based
+    UPDATE per table, touching only the rows whose count is wrong.
+    """
+    help = 'Recompute the recipe counts of tags and ingredients.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for field_name, model in bulk.RECIPE_LINKS:
+            through, source, target = bulk.recipe_through(field_name)
+            counts = Coalesce(
+                Subquery(
+                    through.objects.filter(**{target: OuterRef('pk')})
+                    .values(target)
+                    .annotate(count=Count('*'))
+                    .values('count')
+                ),
+                Value(0),
+            )
+            with transaction.atomic():
+                fixed = (
+                    model.objects.alias(actual=counts)
+                    .exclude(recipe_count=F('actual'))
+                    .update(recipe_count=counts)
+                )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: fixed {fixed} counts'
+            )
+        self.stdout.write(self.style.SUCCESS('Recipe counts repaired.'))
@@ -0,0 +1,50 @@
+"""
+django command to prepare the database and static files for the server
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core import startup
+
+
+class Command(BaseCommand):
+    """Django command run before the server starts.
+
+    Waits for the database, then runs migrate only when migrations are
+    unapplied and collectstatic only when the static files' fingerprint
+    differs from the one saved by the last collectstatic, so a restart
+    with nothing new skips both. The OpenAPI schema is built when the code
+    has changed since it was last written.
+    """
+    help = 'Wait for the database and run migrate/collectstatic/build_schema if needed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        database = options['database']
+        call_command(
+            'wait_for_db',
+            database=database,
+            timeout=options['timeout'],
+            stdout=self.stdout,
+        )
+
+        if startup.unapplied_migrations(database):
+            call_command(
+                'migrate', database=database, interactive=False, stdout=self.stdout,
+            )
+        else:
+            self.stdout.write('migrations up to date, skipping migrate')
+
+        fingerprint = startup.static_fingerprint()
+        if fingerprint == startup.collected_static_fingerprint():
+            self.stdout.write('static files unchanged, skipping collectstatic')
+        else:
+            call_command('collectstatic', interactive=False, stdout=self.stdout)
+            startup.save_static_fingerprint(fingerprint)
+
+        call_command('build_schema', stdout=self.stdout)
@@ -1,26 +1,50 @@
 """
 django command to wait for the database to be available
 """
-from django.core.management.base import BaseCommand
 import time
+
 from psycopg2 import OperationalError as Psycopg2Error
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core.startup import probe_database
+
 
 class Command(BaseCommand):
-    """Django command to wait for database."""
-    
-    def handle(self, *args,**options):
+    """Django command to wait for database.
+
+    Only opens a connection, retrying with exponential backoff until the
+    database answers or --timeout seconds have passed.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='seconds to wait before giving up',
+        )
+        parser.add_argument('--max-delay', type=float, default=5)
+
+    def handle(self, *args, **options):
         """Entrypoint for command"""
         self.stdout.write("waiting for database")
-        db_up = False
-        while db_up is False:
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                self.check(databases=["default"])
-                db_up = True
+                probe_database(options['database'])
+                break
             except (Psycopg2Error, OperationalError):
-                self.stdout.write("database unavailable, waiting 1 second...")
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"database unavailable after {options['timeout']:g} seconds"
+                    )
+                delay = min(delay, remaining)
+                self.stdout.write(f"database unavailable, waiting {delay:.1f} seconds...")
+                time.sleep(delay)
+                delay = min(delay * 2, options['max_delay'])
         self.stdout.write(self.style.SUCCESS('Database available!'))
-
-        
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+import core.files
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.files.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
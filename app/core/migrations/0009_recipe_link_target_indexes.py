@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index the recipe M2M tables by (target, recipe).
+
+    Filtering recipes by tag or ingredient ids reads these tables by target
+    id; with the recipe id in the index the lookups are index-only scans.
+    Auto-created M2M tables cannot declare Meta.indexes, hence RunSQL.
+    """
+
+    dependencies = [
+        ('core', '0008_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX core_recipe_tags_tag_recipe_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            'DROP INDEX core_recipe_ingredients_ingredient_recipe_idx',
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:42
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+INDEX = 'core_recipe_search_vector_idx'
+
+LINK_DOCUMENT = """
+ || setweight(to_tsvector(%(config)s, coalesce((
+    SELECT string_agg(t.name, ' ') FROM core_tag t
+    JOIN core_recipe_tags rt ON rt.tag_id = t.id WHERE rt.recipe_id = r.id
+ ), '')), 'C')
+ || setweight(to_tsvector(%(config)s, coalesce((
+    SELECT string_agg(i.name, ' ') FROM core_ingredient i
+    JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+    WHERE ri.recipe_id = r.id
+ ), '')), 'C')
+"""
+
+
+def add_search_index(apps, schema_editor):
+    """Index and fill in the search documents on PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX} ON core_recipe USING gin (search_vector)'
+    )
+    document = (
+        "setweight(to_tsvector(%(config)s, coalesce(r.title, '')), 'A')"
+        " || setweight(to_tsvector(%(config)s, coalesce(r.description, '')), 'B')"
+    )
+    if settings.RECIPE_SEARCH_INCLUDE_LINKS:
+        document += LINK_DOCUMENT
+    schema_editor.execute(
+        f'UPDATE core_recipe r SET search_vector = {document}',
+        {'config': settings.RECIPE_SEARCH_CONFIG},
+    )
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_link_target_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,205 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+"""Unique tag/ingredient names per user and the recipe list index.
+
+Deploy order: run migrate before starting the new code, which relies on
+the unique constraints. The old code keeps running meanwhile and may
+create a duplicate name after the merge; the unique index build then
+fails, and running migrate again merges it and resumes. Every step on
+PostgreSQL can be rerun: valid indexes and attached constraints are
+kept, invalid leftovers of an interrupted build are rebuilt.
+"""
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+RECIPE_INDEX = 'core_recipe_user_id_idx'
+# (model, Recipe M2M field, unique constraint)
+UNIQUE_NAMES = (
+    ('Tag', 'tags', 'core_tag_user_name_uniq'),
+    ('Ingredient', 'ingredients', 'core_ingredient_user_name_uniq'),
+)
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags/ingredients sharing a (user, name) into the oldest one."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name, constraint in UNIQUE_NAMES:
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        target = f'{field.m2m_reverse_field_name()}_id'
+
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(count=Count('id'), keep=Min('id'))
+            .filter(count__gt=1)
+        )
+        for row in duplicates.iterator():
+            others = model.objects.filter(
+                user_id=row['user_id'], name=row['name'],
+            ).exclude(id=row['keep'])
+            recipe_ids = through.objects.filter(
+                **{f'{target}__in': others.values('id')},
+            ).values_list('recipe_id', flat=True)
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe_id, **{target: row['keep']})
+                    for recipe_id in set(recipe_ids)
+                ],
+                ignore_conflicts=True,
+            )
+            others.delete()
+
+
+def user_indexes(schema_editor, table):
+    """Return the names of the plain single column indexes on user_id."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, info in constraints.items()
+        if info['index'] and info['columns'] == ['user_id']
+        and not (info['unique'] or info['primary_key'] or info['foreign_key'])
+    ]
+
+
+def build_index(schema_editor, name, definition):
+    """CREATE INDEX CONCURRENTLY ``name``, resuming an interrupted build.
+
+    An interrupted build leaves an invalid index behind, which is dropped
+    and built again; a valid index is kept.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)',
+            [name],
+        )
+        row = cursor.fetchone()
+    if row is not None and not row[0]:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    schema_editor.execute(
+        definition.format(name=f'CONCURRENTLY IF NOT EXISTS {name}')
+    )
+
+
+def constraint_exists(schema_editor, table, name):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_constraint '
+            'WHERE conrelid = to_regclass(%s) AND conname = %s',
+            [table, name],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_indexes(apps, schema_editor):
+    """Build the indexes, without locking writes on PostgreSQL.
+
+    CONCURRENTLY cannot run in a transaction, hence the non-atomic
+    migration. Unique constraints are attached to their prebuilt index
+    with UNIQUE USING INDEX, unless an earlier run attached them already.
+    The user_id foreign key indexes are dropped last, as the new indexes
+    cover them.
+    """
+    tables = ['core_recipe'] + [
+        f'core_{model_name.lower()}' for model_name, field_name, constraint in UNIQUE_NAMES
+    ]
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {RECIPE_INDEX} ON core_recipe (user_id, id DESC)'
+        )
+        for model_name, field_name, constraint in UNIQUE_NAMES:
+            table = f'core_{model_name.lower()}'
+            schema_editor.execute(
+                f'CREATE UNIQUE INDEX {constraint} ON {table} (user_id, name)'
+            )
+        for table in tables:
+            for name in user_indexes(schema_editor, table):
+                schema_editor.execute(f'DROP INDEX {name}')
+        return
+
+    build_index(
+        schema_editor, RECIPE_INDEX,
+        'CREATE INDEX {name} ON core_recipe (user_id, id DESC)',
+    )
+    for model_name, field_name, constraint in UNIQUE_NAMES:
+        table = f'core_{model_name.lower()}'
+        if constraint_exists(schema_editor, table, constraint):
+            continue
+        build_index(
+            schema_editor, constraint,
+            f'CREATE UNIQUE INDEX {{name}} ON {table} (user_id, name)',
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {constraint} '
+            f'UNIQUE USING INDEX {constraint}'
+        )
+    for table in tables:
+        for name in user_indexes(schema_editor, table):
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def drop_indexes(apps, schema_editor):
+    postgresql = schema_editor.connection.vendor == 'postgresql'
+    concurrently = 'CONCURRENTLY ' if postgresql else ''
+    for model_name in ('Recipe', 'Tag', 'Ingredient'):
+        model = apps.get_model('core', model_name)
+        schema_editor.execute(schema_editor._create_index_sql(
+            model, fields=[model._meta.get_field('user')],
+        ))
+    for model_name, field_name, constraint in UNIQUE_NAMES:
+        if postgresql:
+            schema_editor.execute(
+                f'ALTER TABLE core_{model_name.lower()} DROP CONSTRAINT {constraint}'
+            )
+        else:
+            schema_editor.execute(f'DROP INDEX {constraint}')
+    schema_editor.execute(f'DROP INDEX {concurrently}{RECIPE_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop, atomic=True,
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                *[
+                    migrations.AlterField(
+                        model_name=model_name,
+                        name='user',
+                        field=models.ForeignKey(
+                            db_index=False,
+                            on_delete=django.db.models.deletion.CASCADE,
+                            to=settings.AUTH_USER_MODEL,
+                        ),
+                    )
+                    for model_name in ('ingredient', 'recipe', 'tag')
+                ],
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=models.Index(fields=['user', '-id'], name='core_recipe_user_id_idx'),
+                ),
+                migrations.AddConstraint(
+                    model_name='ingredient',
+                    constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+                ),
+                migrations.AddConstraint(
+                    model_name='tag',
+                    constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
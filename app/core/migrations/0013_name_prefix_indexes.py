@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:59
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# (table, index)
+INDEXES = (
+    ('core_tag', 'core_tag_lname_idx'),
+    ('core_ingredient', 'core_ingredient_lname_idx'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    """Build the indexes, concurrently on PostgreSQL (see 0011).
+
+    text_pattern_ops lets LIKE 'prefix%' use the index whatever the
+    database collation; other databases get a plain lower(name) index.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        for table, index in INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX {index} ON {table} (user_id, lower(name))'
+            )
+        return
+
+    for table, index in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY {index} '
+            f'ON {table} (user_id, lower(name) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = (
+        'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    )
+    for table, index in INDEXES:
+        schema_editor.execute(f'DROP INDEX {concurrently}{index}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=models.Index(models.F('user'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='core_ingredient_lname_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='tag',
+                    index=models.Index(models.F('user'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='core_tag_lname_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
@@ -4,15 +4,50 @@ import os
 from django.db import models
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager, PermissionsMixin)
 from django.conf import settings
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from core import hashing
+from core.files import ContentAddressedStorage, content_hash
 
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image."""
+    """Generate file path for new recipe image.
+
+    Images are named by the SHA-256 of their content, so identical uploads
+    share one file; the name falls back to a uuid when there is no content
+    to hash yet.
+    """
     ext = os.path.splitext(filename)[1]
+    image = getattr(instance, 'image', None)
+    if image and not image._committed:
+        digest = content_hash(image.file)
+        return os.path.join('uploads', 'recipe', digest[:2], f'{digest}{ext.lower()}')
+
     filename = f'{uuid.uuid4()}{ext}'
 
     return os.path.join('uploads','recipe', filename)
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    """Users, invalidating cached tokens when update() deactivates them."""
+
+    def update(self, **kwargs):
+        if 'is_active' not in kwargs:
+            return super().update(**kwargs)
+        # imported here as user.authentication needs the app registry
+        from user.authentication import invalidate_user_tokens
+
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        for user_id in user_ids:
+            invalidate_user_tokens(user_id)
+        return rows
+
+    update.alters_data = True
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """manage for users"""
 
     def create_user(self, email, password=None, **extra_field):
@@ -25,6 +60,16 @@ class UserManager(BaseUserManager):
 
         return user
 
+    async def acreate_user(self, email, password=None, **extra_field):
+        """Async create_user() that awaits the password hash."""
+        if not email:
+            raise ValueError('User must have an email address')
+        user = self.model(email=self.normalize_email(email), **extra_field)
+        await user.aset_password(password)
+        await user.asave(using=self._db)
+
+        return user
+
     def create_superuser(self, email, password):
         """create and return superuser."""
 
@@ -47,11 +92,40 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    # passwords are hashed in core.hashing's process pool, not inline
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    async def aset_password(self, raw_password):
+        """Async counterpart of set_password()."""
+        self.password = await hashing.amake_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # a rehash on login is not a password change
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            await self.aset_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=['password'])
+
+        return await hashing.acheck_password(raw_password, self.password, setter)
+
 class Recipe(models.Model):
     """Recipe object."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by the (user, ...) index in Meta
     )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -60,8 +134,20 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+    renditions = models.JSONField(null=True, blank=True)
+    # weighted full-text document, maintained by recipe.search on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
+    class Meta:
+        indexes = [
+            # the user's recipes, newest first
+            models.Index(fields=['user', '-id'], name='core_recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -71,8 +157,26 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by the (user, ...) index in Meta
     )
+    # number of recipes linked, maintained by recipe.bulk and recipe.signals
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='core_tag_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            # case-insensitive prefix search for autocomplete
+            models.Index(
+                F('user'),
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='core_tag_lname_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -82,8 +186,35 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by the (user, ...) index in Meta
     )
+    # number of recipes linked, maintained by recipe.bulk and recipe.signals
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='core_ingredient_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            # case-insensitive prefix search for autocomplete
+            models.Index(
+                F('user'),
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='core_ingredient_lname_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+class ImportCheckpoint(models.Model):
+    """Progress of a resumable import job."""
+    name = models.CharField(max_length=255, unique=True)
+    line = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} (line {self.line})'
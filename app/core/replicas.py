@@ -0,0 +1,150 @@
+"""Read-replica routing.
+
+Views using ReplicaReadMixin send the queries of safe requests to a
+replica from DATABASE_REPLICAS, picked at random by weight. A user whose
+data changed within DB_REPLICA_STICKY_SECONDS keeps reading from the
+primary so they see their own writes, and replicas that are down or
+lagging by more than DB_REPLICA_MAX_LAG seconds are skipped. Everything
+else, including every write, uses the primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from recipe.cache import recently_written
+
+# replay lag in seconds; 0 when the replica has replayed all it received
+LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() '
+        'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+    ),
+}
+
+# alias the current request reads from; None for the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+# alias -> (monotonic time, usable) of the last check in this process
+_health = {}
+
+
+def replica_usable(alias):
+    """Return whether ``alias`` answered and was not lagging recently.
+
+    The replica is queried at most once per DB_REPLICA_CHECK_INTERVAL
+    seconds per process.
+    """
+    checked_at, usable = _health.get(alias, (None, False))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+        return usable
+
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL.get(connection.vendor, 'SELECT 0'))
+            lag = cursor.fetchone()[0] or 0
+        usable = lag <= settings.DB_REPLICA_MAX_LAG
+    except DatabaseError:
+        connection.close()
+        usable = False
+    _health[alias] = (now, usable)
+    return usable
+
+
+def mark_unavailable(alias):
+    """Skip ``alias`` until its next check is due."""
+    _health[alias] = (time.monotonic(), False)
+
+
+def choose_replica():
+    """Return a usable replica alias picked by weight, or None."""
+    replicas = {
+        alias: weight
+        for alias, weight in settings.DATABASE_REPLICAS.items()
+        if replica_usable(alias)
+    }
+    if not replicas:
+        return None
+    return random.choices(list(replicas), weights=list(replicas.values()))[0]
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # reads inside a transaction must see its writes
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # also for objects that were read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica.
+
+    The replica is chosen after authentication, so tokens are always read
+    from the primary. A request whose replica fails is retried once on
+    another replica or the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not self.recently_written()
+        ):
+            _read_alias.set(choose_replica())
+
+    def recently_written(self):
+        """Return whether the user's data changed in the sticky window."""
+        return recently_written(self.request.user.id)
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except DatabaseError:
+            alias = _read_alias.get()
+            if alias is None:
+                raise
+            mark_unavailable(alias)
+            _read_alias.set(None)
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    async def adispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return await super().adispatch(request, *args, **kwargs)
+        except DatabaseError:
+            alias = _read_alias.get()
+            if alias is None:
+                raise
+            mark_unavailable(alias)
+            _read_alias.set(None)
+            return await super().adispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
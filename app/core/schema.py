@@ -0,0 +1,136 @@
+"""Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is
+built once per code version instead of per request: ``build_schema``
+renders it as YAML and JSON, plain and gzipped, into OPENAPI_SCHEMA_ROOT
+under a fingerprint of the code, and processes load those files once.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib import metadata
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+RENDERERS = {'yaml': OpenApiYamlRenderer, 'json': OpenApiJsonRenderer}
+# packages whose upgrades can change the generated schema
+PACKAGES = ('django', 'djangorestframework', 'drf-spectacular')
+
+_lock = threading.Lock()
+_documents = None
+
+
+@dataclass(frozen=True)
+class SchemaDocument:
+    """One rendering of the schema, with its gzipped copy and ETags."""
+    body: bytes
+    gzipped: bytes
+    etag: str
+    gzip_etag: str
+
+    @classmethod
+    def from_body(cls, body, gzipped=None):
+        if gzipped is None:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        return cls(body, gzipped, f'"{digest}"', f'"{digest}-gzip"')
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint():
+    """Hash the project's Python sources, package versions and schema
+    settings; the schema can only change when this does."""
+    digest = hashlib.sha256()
+    for package in PACKAGES:
+        digest.update(f'{package}=={metadata.version(package)}\n'.encode())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+
+    paths = []
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs[:] = [name for name in dirs if not name.startswith(('.', '__'))]
+        paths.extend(os.path.join(root, name) for name in files if name.endswith('.py'))
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()[:32]
+
+
+def schema_path(fmt, fingerprint=None):
+    """Return the file the schema is saved in for format ``fmt``."""
+    return os.path.join(
+        settings.OPENAPI_SCHEMA_ROOT,
+        f'{fingerprint or code_fingerprint()}.{fmt}',
+    )
+
+
+def generate_schema():
+    """Return a {format: SchemaDocument} map for a freshly generated schema."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        fmt: SchemaDocument.from_body(renderer().render(schema, renderer_context={}))
+        for fmt, renderer in RENDERERS.items()
+    }
+
+
+def _write(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_schema(documents):
+    """Write the schema files for the current code, removing older ones."""
+    fingerprint = code_fingerprint()
+    os.makedirs(settings.OPENAPI_SCHEMA_ROOT, exist_ok=True)
+    for fmt, document in documents.items():
+        path = schema_path(fmt, fingerprint)
+        _write(path, document.body)
+        _write(f'{path}.gz', document.gzipped)
+
+    for name in os.listdir(settings.OPENAPI_SCHEMA_ROOT):
+        if not name.startswith(f'{fingerprint}.'):
+            os.remove(os.path.join(settings.OPENAPI_SCHEMA_ROOT, name))
+
+
+def load_schema():
+    """Return the saved schema documents for the current code, or None."""
+    documents = {}
+    try:
+        for fmt in RENDERERS:
+            path = schema_path(fmt)
+            with open(path, 'rb') as file:
+                body = file.read()
+            with open(f'{path}.gz', 'rb') as file:
+                documents[fmt] = SchemaDocument.from_body(body, file.read())
+    except OSError:
+        return None
+    return documents
+
+
+def get_schema():
+    """Return this process's schema documents, loaded once.
+
+    Falls back to generating the schema, and saving it if the directory is
+    writable, when ``build_schema`` has not run for this code.
+    """
+    global _documents
+    if _documents is None:
+        with _lock:
+            if _documents is None:
+                documents = load_schema()
+                if documents is None:
+                    documents = generate_schema()
+                    try:
+                        save_schema(documents)
+                    except OSError:
+                        pass
+                _documents = documents
+    return _documents
@@ -0,0 +1,151 @@
+"""Startup and readiness helpers.
+
+Used by the ``wait_for_db`` and ``startup`` commands before the server
+starts, by the server processes to warm up before their first request,
+and by the health check views.
+"""
+import hashlib
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import URLResolver, get_resolver
+
+STATIC_FINGERPRINT_FILE = '.collectstatic-fingerprint'
+
+# (monotonic time, result) of the last readiness probe in this process
+_last_probe = (None, False)
+
+
+def probe_database(alias=DEFAULT_DB_ALIAS):
+    """Connect to ``alias`` if not connected, raising OperationalError if
+    the database is down. Runs no system checks or queries."""
+    connections[alias].ensure_connection()
+
+
+def unapplied_migrations(alias=DEFAULT_DB_ALIAS):
+    """Return the migrations ``migrate`` would apply to ``alias``."""
+    executor = MigrationExecutor(connections[alias])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def static_fingerprint():
+    """Hash the path, size and mtime of every file collectstatic copies.
+
+    Only stats the source files, so it costs a fraction of a collectstatic
+    run and changes whenever one would copy something new.
+    """
+    ignore_patterns = apps.get_app_config('staticfiles').ignore_patterns
+    entries = []
+    for finder in get_finders():
+        for path, storage in finder.list(ignore_patterns):
+            stat = os.stat(storage.path(path))
+            entries.append(f'{path}\0{storage.path(path)}\0{stat.st_size}\0{stat.st_mtime_ns}')
+
+    digest = hashlib.sha256(str(settings.STATIC_ROOT).encode())
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def _static_fingerprint_path():
+    return os.path.join(settings.STATIC_ROOT, STATIC_FINGERPRINT_FILE)
+
+
+def collected_static_fingerprint():
+    """Return the fingerprint saved by the last collectstatic, if any."""
+    try:
+        with open(_static_fingerprint_path(), encoding='ascii') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def save_static_fingerprint(fingerprint):
+    with open(_static_fingerprint_path(), 'w', encoding='ascii') as file:
+        file.write(fingerprint)
+
+
+def _view_classes(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _view_classes(pattern.url_patterns)
+        else:
+            view_cls = getattr(pattern.callback, 'cls', None)
+            if view_cls is not None:
+                yield view_cls
+
+
+def warm_up():
+    """Import every view and build the API serializers' fields.
+
+    Django loads the URLconf, and with it the views and serializers, on
+    the first request; doing it at startup keeps that off a user's request
+    and, under uwsgi, does it once in the master before workers fork.
+    """
+    for view_cls in set(_view_classes(get_resolver().url_patterns)):
+        for name in ('serializer_class', 'count_serializer_class'):
+            serializer_class = getattr(view_cls, name, None)
+            if serializer_class is not None:
+                serializer_class().fields
+
+
+def _pooled(connection):
+    return bool(connection.settings_dict['OPTIONS'].get('pool'))
+
+
+def warm_databases():
+    """Open the persistent connections or connection pools of this process.
+
+    Aliases with neither CONN_MAX_AGE nor a pool are skipped: Django would
+    close their connection before the first request anyway. Call it after
+    forking, never in a process that forks workers.
+    """
+    for alias in connections:
+        connection = connections[alias]
+        if not (connection.settings_dict['CONN_MAX_AGE'] or _pooled(connection)):
+            continue
+        try:
+            probe_database(alias)
+        except DatabaseError:
+            continue
+        if _pooled(connection):
+            # the pool stays open with min_size connections
+            connection.close()
+
+
+def close_databases():
+    """Close this process's connections and pools, e.g. when a worker exits,
+    so the database sees clean disconnects."""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if _pooled(connection):
+            connection.close_pool()
+
+
+def database_ready(alias=DEFAULT_DB_ALIAS):
+    """Return whether ``alias`` answered a query recently.
+
+    The query runs at most once per READINESS_CHECK_INTERVAL seconds per
+    process; other calls return the last result without touching the
+    database.
+    """
+    global _last_probe
+    checked_at, ready = _last_probe
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < settings.READINESS_CHECK_INTERVAL:
+        return ready
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        ready = True
+    except DatabaseError:
+        ready = False
+    _last_probe = (now, ready)
+    return ready
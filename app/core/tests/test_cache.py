@@ -0,0 +1,35 @@
+"""
+Tests for the in-process caches.
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the in-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full."""
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries are dropped once their TTL has passed."""
+        patched_monotonic.return_value = 100
+        lru = LRUCache(maxsize=2, ttl=10)
+        lru.set('a', 1)
+
+        patched_monotonic.return_value = 111
+
+        self.assertIsNone(lru.get('a'))
@@ -2,34 +2,318 @@
 test custom django management commands,
 """
 
-from unittest.mock import patch
+import io
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
 
-@patch("core.management.commands.wait_for_db.Command.check")
+from core.management.commands.import_recipes import Command
+from core.models import ImportCheckpoint, Recipe, Tag
+
+@patch("core.management.commands.wait_for_db.probe_database")
 class CommandTests(SimpleTestCase):
     """test command."""
     
-    def test_wait_for_db_ready(self, patched_check:SimpleTestCase):
+    def test_wait_for_db_ready(self, patched_probe:SimpleTestCase):
         """test waiting for database if database ready."""
-        patched_check.return_value= True
-        
-        call_command("wait_for_db")
+        call_command("wait_for_db", stdout=io.StringIO())
         
-        patched_check.assert_called_once_with(databases=["default"])
+        patched_probe.assert_called_once_with('default')
         
     @patch('time.sleep')    
-    def test_wait_for_db_delay(self, patched_sleep,patched_check:SimpleTestCase):
-        """test waiting for database when getting OperationalError"""
+    def test_wait_for_db_delay(self, patched_sleep,patched_probe:SimpleTestCase):
+        """test waiting for database backs off when getting OperationalError"""
         
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+        patched_probe.side_effect = [Psycopg2Error] * 2 + \
+            [OperationalError] * 5 + [None]
         
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=io.StringIO())
         
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        self.assertEqual(patched_probe.call_count, 8)
+        delays = [args[0] for args, kwargs in patched_sleep.call_args_list]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 5])
+
+    @patch('time.sleep')
+    @patch('time.monotonic')
+    def test_wait_for_db_timeout(self, patched_monotonic, patched_sleep, patched_probe):
+        """test waiting for database gives up at the deadline"""
+        clock = [0.0]
+        patched_monotonic.side_effect = lambda: clock[0]
+        patched_sleep.side_effect = lambda delay: clock.__setitem__(0, clock[0] + delay)
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=1, stdout=io.StringIO())
+
+        self.assertAlmostEqual(sum(args[0] for args, kwargs in patched_sleep.call_args_list), 1)
+
+
+@patch('core.management.commands.startup.call_command')
+@patch('core.startup.static_fingerprint', return_value='abc')
+class StartupCommandTests(SimpleTestCase):
+    """Test the startup command."""
+
+    def setUp(self):
+        self.static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_root.cleanup)
+        override = self.settings(STATIC_ROOT=self.static_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    @patch('core.startup.unapplied_migrations', return_value=[('plan', False)])
+    def test_first_start_migrates_and_collects(self, patched_plan, patched_fingerprint, patched_call):
+        """Test pending migrations and new static files are handled."""
+        call_command('startup', stdout=io.StringIO())
+
+        commands = [args[0] for args, kwargs in patched_call.call_args_list]
+        self.assertEqual(commands, ['wait_for_db', 'migrate', 'collectstatic', 'build_schema'])
+        with open(os.path.join(self.static_root.name, '.collectstatic-fingerprint')) as file:
+            self.assertEqual(file.read(), 'abc')
+
+    @patch('core.startup.unapplied_migrations', return_value=[])
+    def test_restart_skips_unchanged(self, patched_plan, patched_fingerprint, patched_call):
+        """Test migrate and collectstatic are skipped when nothing changed."""
+        with open(os.path.join(self.static_root.name, '.collectstatic-fingerprint'), 'w') as file:
+            file.write('abc')
+
+        call_command('startup', stdout=io.StringIO())
+
+        commands = [args[0] for args, kwargs in patched_call.call_args_list]
+        self.assertEqual(commands, ['wait_for_db', 'build_schema'])
+
+
+class ImportRecipesCommandTests(TestCase):
+    """test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+
+    def write_lines(self, rows):
+        """write rows as JSON Lines to a temporary file and return its path."""
+        handle = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        self.addCleanup(os.remove, handle.name)
+        with handle:
+            for row in rows:
+                handle.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+        return handle.name
+
+    def recipe_row(self, title, **extra):
+        row = {'title': title, 'time_minutes': 5, 'price': '3.50'}
+        row.update(extra)
+        return row
+
+    def test_import_recipes(self):
+        """test recipes are imported with deduplicated tags per user."""
+        path = self.write_lines([
+            self.recipe_row('One', tags=[{'name': 'Vegan'}]),
+            self.recipe_row('Two', tags=[{'name': 'Vegan'}],
+                            ingredients=[{'name': 'Salt'}]),
+            self.recipe_row('Three', user='other@example.com',
+                            tags=[{'name': 'Vegan'}]),
+        ])
+
+        call_command('import_recipes', path, user='user@example.com',
+                     batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.other).count(), 1)
+        recipe = Recipe.objects.get(title='Two')
+        self.assertEqual(recipe.tags.get().name, 'Vegan')
+        self.assertEqual(recipe.ingredients.get().name, 'Salt')
+
+    def test_invalid_lines_skipped(self):
+        """test invalid lines are reported and the rest imported."""
+        path = self.write_lines([
+            'not json',
+            self.recipe_row('Bad', price='free'),
+            self.recipe_row('Nobody', user='nobody@example.com'),
+            self.recipe_row('Good'),
+        ])
+        stderr = io.StringIO()
+
+        call_command('import_recipes', path, user='user@example.com',
+                     stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Good'],
+        )
+        self.assertIn('line 1', stderr.getvalue())
+        self.assertIn('line 2', stderr.getvalue())
+        self.assertIn('line 3', stderr.getvalue())
+
+    def test_import_from_stdin(self):
+        """test rows can be piped in on stdin."""
+        stdin = io.StringIO(json.dumps(self.recipe_row('Piped')) + '\n')
+
+        with patch('sys.stdin', stdin):
+            call_command('import_recipes', '-', user='user@example.com',
+                         stdout=io.StringIO())
+
+        self.assertTrue(Recipe.objects.filter(title='Piped').exists())
+
+    def test_resume_job(self):
+        """test a rerun of a crashed job resumes after the last batch."""
+        path = self.write_lines(
+            [self.recipe_row(f'Recipe {i}') for i in range(4)]
+        )
+        write = Command._write
+        calls = []
+
+        def crash_on_second_batch(command, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('crash')
+            return write(command, rows)
+
+        with patch.object(Command, '_write', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                call_command('import_recipes', path, user='user@example.com',
+                             batch_size=2, job='seed', stdout=io.StringIO())
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        call_command('import_recipes', path, user='user@example.com',
+                     batch_size=2, job='seed', stdout=io.StringIO())
+
+        self.assertEqual(Recipe.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get(name='seed').line, 4)
+
+    def test_copy_requires_postgres(self):
+        """test --copy is refused on other databases."""
+        if connection.vendor == 'postgresql':
+            self.skipTest('COPY is available')
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', '-', copy=True, stdout=io.StringIO())
+
+
+    def test_copy_on_either_driver(self):
+        """test COPY sends the same CSV through psycopg 3 and psycopg2."""
+        sent = {}
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.copy.return_value.__enter__.return_value.write = (
+            lambda data: sent.update(psycopg3=data)
+        )
+        cursor.copy_expert = lambda sql, file: sent.update(psycopg2=file.read())
+
+        for is_psycopg3 in (True, False):
+            with patch(
+                'django.db.backends.postgresql.psycopg_any.is_psycopg3',
+                is_psycopg3,
+            ), patch.object(connection, 'cursor', return_value=cursor):
+                Command()._copy('core_tag', ['user_id', 'name'], [[1, 'Vegan']])
+
+        self.assertEqual(sent['psycopg3'], '"1","Vegan"\r\n')
+        self.assertEqual(sent['psycopg2'], sent['psycopg3'])
+
+class CheckQueryPlansCommandTests(TestCase):
+    """test the EXPLAIN check of the hot queries."""
+
+    def test_hot_queries_use_indexes(self):
+        """test every hot query is planned on its index."""
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+
+        self.assertIn('All hot queries use their indexes.', out.getvalue())
+
+    def test_missing_index_fails(self):
+        """test a query not served by its index fails the check."""
+        queries = [(
+            'recipe list page',
+            'core_recipe_missing_idx',
+            lambda: Recipe.objects.filter(user_id=1).order_by('-id'),
+        )]
+        with patch(
+            'core.management.commands.check_query_plans.HOT_QUERIES', queries,
+        ):
+            with self.assertRaises(CommandError):
+                call_command('check_query_plans', stdout=io.StringIO(),
+                             stderr=io.StringIO())
+
+
+class RepairRecipeCountsCommandTests(TestCase):
+    """test recomputing the recipe counts."""
+
+    def test_repair_recipe_counts(self):
+        """test wrong counts are recomputed from the links."""
+        user = get_user_model().objects.create_user('user@example.com', 'pass123')
+        recipe = Recipe.objects.create(
+            user=user, title='Curry', time_minutes=30, price='5.50',
+        )
+        vegan = Tag.objects.create(user=user, name='Vegan')
+        unused = Tag.objects.create(user=user, name='Unused')
+        recipe.tags.add(vegan)
+        Tag.objects.update(recipe_count=7)
+
+        out = io.StringIO()
+        call_command('repair_recipe_counts', stdout=out)
+
+        vegan.refresh_from_db()
+        unused.refresh_from_db()
+        self.assertEqual((vegan.recipe_count, unused.recipe_count), (1, 0))
+        self.assertIn('tags: fixed 2 counts', out.getvalue())
+
+
+class RebuildRenditionsCommandTests(TestCase):
+    """test rendering the renditions lost with their job."""
+
+    def test_rebuild_renditions(self):
+        """test only images without renditions are rendered."""
+        user = get_user_model().objects.create_user('user@example.com', 'pass123')
+        lost = Recipe.objects.create(
+            user=user, title='Curry', time_minutes=30, price='5.50',
+            image='uploads/recipe/lost.jpg',
+        )
+        Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price='2.50',
+            image='uploads/recipe/done.jpg', renditions={'medium': 'done.webp'},
+        )
+        Recipe.objects.create(user=user, title='Toast', time_minutes=2, price='1.00')
+
+        out = io.StringIO()
+        with patch(
+            'recipe.renditions.render', return_value={'medium': 'lost.webp'},
+        ) as patched_render:
+            call_command('rebuild_renditions', stdout=out)
+
+        patched_render.assert_called_once_with('uploads/recipe/lost.jpg')
+        lost.refresh_from_db()
+        self.assertEqual(lost.renditions, {'medium': 'lost.webp'})
+        self.assertIn('Rendered 1 recipe images.', out.getvalue())
+
+
+
+class BenchConnectionsCommandTests(TransactionTestCase):
+    """Test the connection benchmark command."""
+
+    def test_bench_connections(self):
+        """Test both setups are measured and the settings restored."""
+        settings_dict = connection.settings_dict
+        max_age = settings_dict['CONN_MAX_AGE']
+        out = io.StringIO()
+
+        call_command('bench_connections', requests=20, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('new connection: median '))
+        self.assertTrue(lines[1].startswith(f'CONN_MAX_AGE={max_age}: median '))
+        self.assertEqual(settings_dict['CONN_MAX_AGE'], max_age)
@@ -0,0 +1,49 @@
+"""
+Tests for content-addressed file storage.
+"""
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.files import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test saving files under their content's name."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def test_existing_name_reused(self):
+        """Test saving an existing name keeps the stored file."""
+        name = self.storage.save('ab/abcd.jpg', ContentFile(b'image'))
+
+        self.assertEqual(self.storage.save(name, ContentFile(b'image')), name)
+        self.assertEqual(os.listdir(self.storage.path('ab')), ['abcd.jpg'])
+
+    def test_concurrent_identical_save(self):
+        """Test a save losing the race to an identical upload reuses its file."""
+        name = self.storage.save('ab/abcd.jpg', ContentFile(b'image'))
+        os.utime(self.storage.path(name), (0, 0))
+        result = []
+
+        # both saves saw no file when they checked
+        with patch.object(self.storage, 'exists', return_value=False):
+            thread = threading.Thread(
+                target=lambda: result.append(
+                    self.storage.save(name, ContentFile(b'image'))
+                ),
+                daemon=True,
+            )
+            thread.start()
+            thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive(), 'save() did not return')
+        self.assertEqual(result, [name])
+        self.assertTrue(self.storage.recently_used(name))
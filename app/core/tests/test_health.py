@@ -0,0 +1,51 @@
+"""
+Tests for the health check endpoints.
+"""
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import startup
+
+
+class HealthCheckTests(TestCase):
+    """Test the liveness and readiness endpoints."""
+
+    def setUp(self):
+        startup._last_probe = (None, False)
+
+    def test_healthz_skips_database(self):
+        """Test liveness answers without a query."""
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz_probes_once_per_interval(self):
+        """Test readiness reuses the last probe within the interval."""
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse('readyz'))
+        self.assertEqual(res.status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('readyz'))
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(READINESS_CHECK_INTERVAL=0)
+    def test_readyz_database_down(self):
+        """Test readiness fails while the database does not answer."""
+        with patch('django.db.backends.utils.CursorWrapper.execute', side_effect=OperationalError):
+            res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable'})
+
+    def test_warm_up_and_fingerprint(self):
+        """Test warming up loads the API and fingerprints are stable."""
+        startup.warm_up()
+
+        self.assertEqual(startup.static_fingerprint(), startup.static_fingerprint())
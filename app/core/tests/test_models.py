@@ -1,5 +1,9 @@
 """tests for models"""
 
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
@@ -66,6 +70,17 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(
+            user=create_user(email='other@example.com'), name='Vegan',
+        )
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
     def test_create_ingredient(self):
         """Test creating an ingredient is successful."""
         user = create_user()
@@ -82,3 +97,13 @@ class ModelTests(TestCase):
 
         exp_path = f'uploads/recipe/{uuid}.jpg'
         self.assertEqual(file_path, exp_path)
+
+    def test_recipe_file_name_content_hash(self):
+        """Test that an uploaded image is named by its content hash."""
+        content = b'image bytes'
+        recipe = models.Recipe(image=ContentFile(content, name='myimage.JPG'))
+        file_path = models.recipe_image_file_path(recipe, 'myimage.JPG')
+
+        digest = hashlib.sha256(content).hexdigest()
+        exp_path = f'uploads/recipe/{digest[:2]}/{digest}.jpg'
+        self.assertEqual(file_path, exp_path)
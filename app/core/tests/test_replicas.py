@@ -0,0 +1,130 @@
+"""
+Tests for read-replica routing.
+"""
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import replicas
+from core.models import Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+
+# the replica alias a DB_REPLICAS setting creates
+REPLICA = 'replica1'
+
+
+class ChooseReplicaTests(SimpleTestCase):
+    """Test weighted replica selection."""
+
+    def setUp(self):
+        replicas._health.clear()
+
+    @override_settings(DATABASE_REPLICAS={'replica1': 3, 'replica2': 1})
+    def test_skips_unusable_replicas(self):
+        """Test only usable replicas are picked, and None when there are none."""
+        with patch('core.replicas.replica_usable', side_effect=lambda alias: alias == 'replica2'):
+            self.assertEqual(replicas.choose_replica(), 'replica2')
+
+        with patch('core.replicas.replica_usable', return_value=False):
+            self.assertIsNone(replicas.choose_replica())
+
+    @override_settings(DATABASE_REPLICAS={'replica1': 3, 'replica2': 1})
+    def test_weights(self):
+        """Test replicas are picked in proportion to their weights."""
+        with patch('core.replicas.replica_usable', return_value=True):
+            picks = [replicas.choose_replica() for _ in range(2000)]
+
+        self.assertAlmostEqual(picks.count('replica1') / len(picks), 0.75, delta=0.05)
+
+    @override_settings(DATABASE_REPLICAS={'replica1': 1})
+    def test_router(self):
+        """Test writes and migrations always go to the primary."""
+        router = replicas.ReplicaRouter()
+
+        self.assertEqual(router.db_for_write(Tag, instance=Tag(name='x')), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+        self.assertIsNone(router.allow_migrate('default', 'core'))
+
+
+@skipUnless(REPLICA in settings.DATABASES, 'no replica configured (set DB_REPLICAS)')
+@override_settings(DB_REPLICA_STICKY_SECONDS=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test safe API requests are routed to the replica."""
+    # the runner collects databases even from skipped classes
+    databases = {'default', REPLICA} if REPLICA in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        replicas._health.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connections[REPLICA]) as replica_queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return res, replica_queries
+
+    def test_reads_use_replica(self):
+        """Test list requests read from the replica."""
+        res, replica_queries = self._get(TAGS_URL)
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+        self.assertTrue(any('core_tag' in query['sql'] for query in replica_queries))
+
+    @override_settings(DB_REPLICA_STICKY_SECONDS=60)
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a user reads their own writes from the primary."""
+        # saving bumps the user's data version
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res, replica_queries = self._get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_writes_use_primary(self):
+        """Test unsafe requests never touch the replica."""
+        tag = Tag.objects.get(user=self.user)
+        url = reverse('recipe:tag-detail', args=[tag.id])
+
+        with CaptureQueriesContext(connections[REPLICA]) as replica_queries:
+            res = self.client.patch(url, {'name': 'Vegetarian'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
+
+    @override_settings(DB_REPLICA_MAX_LAG=-1)
+    def test_lagging_replica_skipped(self):
+        """Test a replica behind by more than the allowed lag is skipped."""
+        res, replica_queries = self._get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertFalse(any('core_tag' in query['sql'] for query in replica_queries))
+
+    def test_failing_replica_falls_back(self):
+        """Test a read that fails on the replica is retried on the primary."""
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('replica went away')
+
+        replicas._health[REPLICA] = (time.monotonic(), True)
+        with connections[REPLICA].execute_wrapper(fail):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 1)
+        self.assertFalse(replicas.replica_usable(REPLICA))
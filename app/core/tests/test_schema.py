@@ -0,0 +1,91 @@
+"""
+Tests for the precomputed OpenAPI schema.
+"""
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(TestCase):
+    """Test building and serving the schema."""
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        override = self.settings(OPENAPI_SCHEMA_ROOT=self.root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        schema._documents = None
+        self.addCleanup(setattr, schema, '_documents', None)
+
+    def test_build_schema(self):
+        """Test the command writes the schema once per code fingerprint."""
+        with open(os.path.join(self.root.name, 'old.yaml'), 'w') as file:
+            file.write('stale')
+
+        call_command('build_schema', stdout=io.StringIO())
+
+        fingerprint = schema.code_fingerprint()
+        self.assertEqual(sorted(os.listdir(self.root.name)), [
+            f'{fingerprint}.json', f'{fingerprint}.json.gz',
+            f'{fingerprint}.yaml', f'{fingerprint}.yaml.gz',
+        ])
+        with patch('core.schema.generate_schema') as generate:
+            call_command('build_schema', stdout=io.StringIO())
+        generate.assert_not_called()
+
+    def test_schema_served_from_files(self):
+        """Test requests are served without generating the schema again."""
+        call_command('build_schema', stdout=io.StringIO())
+
+        with patch('core.schema.generate_schema') as generate:
+            res = self.client.get(SCHEMA_URL)
+            res_json = self.client.get(SCHEMA_URL, {'format': 'json'})
+        generate.assert_not_called()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'/api/recipe/recipes/', res.content)
+        self.assertIn('"', res['ETag'])
+        self.assertIn('/api/recipe/recipes/', json.loads(res_json.content)['paths'])
+        self.assertNotEqual(res['ETag'], res_json['ETag'])
+
+    def test_schema_gzip(self):
+        """Test clients accepting gzip get the compressed schema."""
+        plain = self.client.get(SCHEMA_URL)
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotEqual(res['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_schema_gzip_refused(self):
+        """Test gzip is not sent to clients refusing it with q=0."""
+        for accept_encoding in ('gzip;q=0, br', 'br', '*;q=0.5, gzip; q=0', ''):
+            res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+            self.assertNotIn('Content-Encoding', res, accept_encoding)
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='br;q=1, *;q=0.1')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_schema_not_modified(self):
+        """Test a matching If-None-Match gets 304 with no body."""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
@@ -0,0 +1,88 @@
+"""
+Tests for Server-Timing instrumentation.
+"""
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+def parse_server_timing(header):
+    """Return {name: (duration, description)} from a Server-Timing value."""
+    metrics = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        values = dict(param.split('=', 1) for param in params)
+        metrics[name] = (float(values['dur']), values.get('desc', '').strip('"'))
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+    """Test sampled requests are timed and reported."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='2.50',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Test requests outside the sample get no header."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_recipe_list_phases(self):
+        """Test the recipe list reports its phases and SQL queries."""
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('core.timing', 'INFO') as logs:
+                res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertEqual(
+            list(metrics),
+            ['auth', 'queryset', 'serialize', 'render', 'db', 'total'],
+        )
+        self.assertEqual(metrics['db'][1], f'{len(queries)} queries')
+        self.assertGreaterEqual(metrics['total'][0], metrics['db'][0])
+
+        record = json.loads(re.sub(r'^INFO:core\.timing:', '', logs.output[0]))
+        self.assertEqual(record['view'], 'recipe:recipe-list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['db_queries'], len(queries))
+        self.assertIn('serialize_ms', record)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_token_view_timed(self):
+        """Test the token view is timed without a queryset phase."""
+        self.client.force_authenticate(None)
+        payload = {'email': 'user@example.com', 'password': 'test123'}
+
+        with self.assertLogs('core.timing', 'INFO'):
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, 200)
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertIn('serialize', metrics)
+        self.assertNotIn('queryset', metrics)
+        self.assertGreater(int(metrics['db'][1].split()[0]), 0)
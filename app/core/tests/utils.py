@@ -0,0 +1,26 @@
+"""
+shared helpers for tests.
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting endpoints stay within a query budget."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using='default'):
+        """Fail if the block runs more than ``budget`` queries."""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        if len(context) > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{len(context)} queries executed, budget is {budget}:\n'
+                f'{queries}'
+            )
@@ -0,0 +1,206 @@
+"""Per-request timing reported in the Server-Timing header and the log.
+
+ServerTimingMiddleware samples SERVER_TIMING_SAMPLE_RATE of requests. For
+those, every SQL query is counted and timed, views with ServerTimingMixin
+time their phases, and the response gets a ``Server-Timing`` header and a
+JSON log line on the ``core.timing`` logger. Requests that are not sampled
+only pay for one context variable lookup per query.
+"""
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# timer of the current request; None when it is not sampled
+_timer = ContextVar('request_timer', default=None)
+
+# Server-Timing metrics in the order they are reported
+PHASES = (
+    ('auth', 'authentication and permissions'),
+    ('queryset', 'queryset building'),
+    ('serialize', 'view code and serialization without SQL'),
+    ('render', 'rendering'),
+)
+
+
+class RequestTimer:
+    """Durations in seconds and SQL totals collected for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.query_time = 0.0
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def metrics(self):
+        """Return (name, milliseconds, description) for every metric."""
+        metrics = [
+            (name, self.durations[name] * 1000, description)
+            for name, description in PHASES
+            if name in self.durations
+        ]
+        metrics.append(('db', self.query_time * 1000, f'{self.queries} queries'))
+        metrics.append(('total', (time.perf_counter() - self.started) * 1000, None))
+        return metrics
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to phase ``name``."""
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper counting and timing sampled queries."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.queries += 1
+        timer.query_time += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Add time_query() to each new connection (connection_created).
+
+    Installed per connection rather than per request because async views
+    run their queries in another thread than the middleware.
+    """
+    if time_query not in connection.execute_wrappers:
+        # first, as connection.execute_wrapper() pops the last wrapper when
+        # its block exits, even if the connection was opened inside it
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def server_timing_header(timer):
+    """Format the timer's metrics as a Server-Timing header value."""
+    entries = []
+    for name, duration, description in timer.metrics():
+        entry = f'{name};dur={duration:.1f}'
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class ServerTimingMiddleware:
+    """Time sampled requests and report them; place it first."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = _timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        return self._report(request, response, timer)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        timer = RequestTimer()
+        token = _timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        return self._report(request, response, timer)
+
+    def _sampled(self):
+        return random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+
+    def _report(self, request, response, timer):
+        response['Server-Timing'] = server_timing_header(timer)
+
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'db_queries': timer.queries,
+        }
+        for name, duration, description in timer.metrics():
+            record[f'{name}_ms'] = round(duration, 2)
+        logger.info(json.dumps(record, separators=(',', ':')))
+        return response
+
+
+class ServerTimingMixin:
+    """Time the phases of a DRF view for sampled requests."""
+
+    def initial(self, request, *args, **kwargs):
+        with phase('auth'):
+            super().initial(request, *args, **kwargs)
+        timer = _timer.get()
+        if timer is not None:
+            # the handler runs between initial() and finalize_response()
+            self._handler_started = (
+                time.perf_counter(),
+                timer.query_time,
+                timer.durations.get('queryset', 0.0),
+            )
+
+    def get_queryset(self):
+        with phase('queryset'):
+            return super().get_queryset()
+
+    def filter_queryset(self, queryset):
+        with phase('queryset'):
+            return super().filter_queryset(queryset)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timer = _timer.get()
+        started = getattr(self, '_handler_started', None)
+        if timer is not None and started is not None:
+            start, query_time, queryset_time = started
+            timer.add('serialize', (
+                time.perf_counter() - start
+                - (timer.query_time - query_time)
+                - (timer.durations.get('queryset', 0.0) - queryset_time)
+            ))
+            self._handler_started = None
+
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if timer is not None and not getattr(response, 'is_rendered', True):
+            render_start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timer.add('render', time.perf_counter() - render_start)
+            )
+        return response
@@ -1,3 +1,99 @@
-from django.shortcuts import render
+"""Health check and schema views."""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from django.views.decorators.cache import never_cache
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
 
-# Create your views here.
+from core.schema import get_schema
+from core.startup import database_ready
+
+
+def accepts_gzip(accept_encoding):
+    """Return whether an Accept-Encoding value allows gzip.
+
+    A coding is refused by ``q=0``, and ``*`` stands for any coding not
+    listed.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights.get('gzip', weights.get('*', 0.0)) > 0
+
+
+def _status(ready):
+    if ready:
+        return JsonResponse({'status': 'ok'})
+    return JsonResponse({'status': 'unavailable'}, status=503)
+
+
+@never_cache
+def healthz(request):
+    """Liveness: the process is serving requests. Never touches the DB."""
+    return _status(True)
+
+
+@never_cache
+def readyz(request):
+    """Readiness: the database answered within READINESS_CHECK_INTERVAL."""
+    return _status(database_ready())
+
+
+@never_cache
+async def ahealthz(request):
+    """Async healthz() for ASGI, so it does not wait on the sync thread."""
+    return _status(True)
+
+
+@never_cache
+async def areadyz(request):
+    """Async readyz() for ASGI."""
+    return _status(await sync_to_async(database_ready)())
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """Serve the precomputed OpenAPI schema from core.schema.
+
+    The format is negotiated as by SpectacularAPIView. Responses carry a
+    strong ETag, are gzipped for clients that accept it and answer
+    If-None-Match with 304.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        """OpenAPI schema for this API, as YAML or, with ?format=json or
+        Accept: application/vnd.oai.openapi+json, as JSON."""
+        document = get_schema()[request.accepted_renderer.format]
+        gzipped = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = document.gzip_etag if gzipped else document.etag
+
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept, Accept-Encoding',
+            'Cache-Control': 'public, no-cache',
+        }
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in if_none_match or {document.etag, document.gzip_etag} & set(if_none_match):
+            return HttpResponseNotModified(headers=headers)
+
+        response = HttpResponse(
+            document.gzipped if gzipped else document.body,
+            content_type=f'{request.accepted_media_type}; charset=utf-8',
+            headers=headers,
+        )
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = (
+            f'inline; filename="{self._get_filename(request, None)}"'
+        )
+        return response
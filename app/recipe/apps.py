@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from recipe import signals  # noqa: F401
+
+        # Pillow refuses to open images over twice this many pixels
+        Image.MAX_IMAGE_PIXELS = settings.RECIPE_IMAGE_MAX_PIXELS
@@ -0,0 +1,121 @@
+"""Async read handlers for the recipe API.
+
+When ``ASYNC_API`` is on (the ASGI deployment), list and retrieve requests
+are served by coroutines using Django's async ORM, so a worker process can
+keep many I/O-bound reads in flight. Writes still go through the regular
+sync viewset actions.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404
+from django.urls import URLPattern
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Serve list/retrieve on a viewset with the async ORM."""
+
+    @classmethod
+    def as_async_view(cls, actions, **initkwargs):
+        """Return an async view for ``actions`` as routed by a DRF router."""
+        sync_view = cls.as_view(actions, **initkwargs)
+        async_actions = {
+            method: actions['get'] for method in ('get', 'head')
+        }
+
+        async def view(request, *args, **kwargs):
+            method = request.method.lower()
+            if method not in async_actions:
+                # writes keep using the sync viewset actions
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = async_actions
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of APIView.dispatch() for read actions."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # authentication, permissions and content negotiation
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        """Async counterpart of GenericAPIView.get_object()."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**lookup)
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        """Return a page of results, or None if pagination is off."""
+        if self.paginator is None:
+            return None
+        return await sync_to_async(self.paginator.paginate_queryset)(
+            queryset, self.request, view=self,
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        """Async counterpart of ListModelMixin.list()."""
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(
+            [obj async for obj in queryset],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Async counterpart of RetrieveModelMixin.retrieve()."""
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def async_urlpatterns(patterns):
+    """Swap router patterns of AsyncReadMixin viewsets to their async views.
+
+    Only routes whose GET action has an async counterpart are swapped.
+    """
+    result = []
+    for pattern in patterns:
+        view = pattern.callback
+        cls = getattr(view, 'cls', None)
+        actions = getattr(view, 'actions', None) or {}
+        if 'get' in actions and hasattr(cls, f'a{actions["get"]}'):
+            pattern = URLPattern(
+                pattern.pattern,
+                cls.as_async_view(actions, **view.initkwargs),
+                pattern.default_args,
+                pattern.name,
+            )
+        result.append(pattern)
+    return result
@@ -0,0 +1,81 @@
+"""Prefix autocomplete over a user's tags or ingredients.
+
+Each process keeps the names of recently active users in memory, sorted
+for binary search, so a keystroke costs one data version lookup and a
+bisect. An index is rebuilt from the database once the user's data version
+changes; users with too many items to hold are searched in the database,
+on the (user, lower(name)) index.
+"""
+import bisect
+import heapq
+
+from django.conf import settings
+from django.db.models.functions import Lower
+
+from core.cache import LRUCache
+
+_indexes = LRUCache(
+    maxsize=settings.AUTOCOMPLETE_CACHE_USERS,
+    ttl=settings.AUTOCOMPLETE_CACHE_TTL,
+)
+
+
+class PrefixIndex:
+    """One user's (id, name, recipe_count) items, sorted by lowercase name."""
+
+    def __init__(self, items):
+        self._items = sorted(
+            (name.lower(), -recipe_count, obj_id, name)
+            for obj_id, name, recipe_count in items
+        )
+        self._keys = [item[0] for item in self._items]
+
+    def search(self, prefix, limit):
+        """Return up to ``limit`` items starting with ``prefix``, most used first."""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._keys, prefix)
+        end = start
+        while end < len(self._keys) and self._keys[end].startswith(prefix):
+            end += 1
+        best = heapq.nsmallest(
+            limit, self._items[start:end], key=lambda item: (item[1], item[0], item[2]),
+        )
+        return [
+            {'id': obj_id, 'name': name, 'recipe_count': -negated_count}
+            for lowered, negated_count, obj_id, name in best
+        ]
+
+
+def _search_database(model, user, prefix, limit):
+    return list(
+        model.objects.filter(user=user)
+        .alias(lower_name=Lower('name'))
+        .filter(lower_name__startswith=prefix.lower())
+        .order_by('-recipe_count', 'lower_name', 'id')
+        .values('id', 'name', 'recipe_count')[:limit]
+    )
+
+
+def complete(model, user, version, prefix, limit):
+    """Return the user's items whose name starts with ``prefix``.
+
+    ``version`` is the user's data version, read before any data so a
+    concurrent write is never cached under the version following it.
+    """
+    key = (model._meta.label, user.id)
+    cached = _indexes.get(key)
+    if cached is None or cached[0] != version:
+        items = list(
+            model.objects.filter(user=user)
+            .values_list('id', 'name', 'recipe_count')[:settings.AUTOCOMPLETE_MAX_ITEMS + 1]
+        )
+        index = None
+        if len(items) <= settings.AUTOCOMPLETE_MAX_ITEMS:
+            index = PrefixIndex(items)
+        cached = (version, index)
+        _indexes.set(key, cached)
+
+    version, index = cached
+    if index is None:
+        return _search_database(model, user, prefix, limit)
+    return index.search(prefix, limit)
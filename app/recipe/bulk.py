@@ -0,0 +1,179 @@
+"""Batched write helpers for recipes and their tags/ingredients."""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import bump_data_version
+from recipe.search import update_search_vectors
+
+RECIPE_LINKS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+def _by_name(queryset):
+    """Return a {name: obj} map, keeping the oldest row for each name."""
+    objs = {}
+    for obj in queryset.order_by('-id'):
+        objs[obj.name] = obj
+    return objs
+
+
+def get_or_create_by_name(model, user, names):
+    """Return a {name: obj} map for ``names``, creating missing rows in bulk.
+
+    Costs one query when every name exists and three otherwise, however
+    many names are passed. Concurrent writers inserting the same name
+    converge on the oldest row because the missing names are re-read after
+    the insert.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    objs = _by_name(model.objects.filter(user=user, name__in=names))
+    missing = [name for name in names if name not in objs]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update(
+            _by_name(model.objects.filter(user=user, name__in=missing))
+        )
+    return objs
+
+
+def recipe_through(field_name):
+    """Return the through model and its (recipe, target) id columns."""
+    field = Recipe._meta.get_field(field_name)
+    return (
+        field.remote_field.through,
+        f'{field.m2m_field_name()}_id',
+        f'{field.m2m_reverse_field_name()}_id',
+    )
+
+
+def adjust_recipe_counts(field_name, deltas):
+    """Add ``{obj_id: delta}`` to the recipe_count of tags or ingredients.
+
+    Runs one UPDATE per distinct delta. The counts are incremented in SQL,
+    so concurrent changes add up rather than overwrite each other.
+    """
+    model = Recipe._meta.get_field(field_name).related_model
+    ids_by_delta = defaultdict(list)
+    for obj_id, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(obj_id)
+    for delta, ids in ids_by_delta.items():
+        model.objects.filter(id__in=ids).update(
+            recipe_count=F('recipe_count') + delta,
+        )
+
+
+def add_recipe_links(field_name, links):
+    """Insert new (recipe_id, obj_id) rows into a Recipe M2M in one statement.
+
+    Counts every link as new, so only use it for links that cannot exist
+    yet, such as those of recipes just created.
+    """
+    through, source, target = recipe_through(field_name)
+    links = list(dict.fromkeys(links))
+    if links:
+        through.objects.bulk_create(
+            [through(**{source: recipe_id, target: obj_id}) for recipe_id, obj_id in links],
+            ignore_conflicts=True,
+        )
+        adjust_recipe_counts(field_name, Counter(obj_id for recipe_id, obj_id in links))
+
+
+def set_recipe_links(field_name, recipe_ids, links):
+    """Make ``links`` the (recipe_id, obj_id) rows of a Recipe M2M.
+
+    The current links of ``recipe_ids`` are replaced; other recipes in
+    ``links`` must have none yet. Only the difference is written, so links
+    kept across an update cost nothing and leave their counts alone.
+    """
+    through, source, target = recipe_through(field_name)
+    current = {}
+    if recipe_ids:
+        rows = through.objects.filter(**{f'{source}__in': recipe_ids})
+        current = {
+            (recipe_id, obj_id): row_id
+            for row_id, recipe_id, obj_id in rows.values_list('id', source, target)
+        }
+    links = list(dict.fromkeys(links))
+    wanted = set(links)
+    removed = [link for link in current if link not in wanted]
+    if removed:
+        through.objects.filter(id__in=[current[link] for link in removed]).delete()
+        adjust_recipe_counts(
+            field_name,
+            {obj_id: -count for obj_id, count in Counter(
+                obj_id for recipe_id, obj_id in removed
+            ).items()},
+        )
+    add_recipe_links(field_name, [link for link in links if link not in current])
+
+
+@transaction.atomic
+def write_recipes(user, items):
+    """Create or update recipes from (instance, validated_data) pairs.
+
+    ``instance`` is None for new recipes. Recipes are written with one
+    bulk_create and one bulk_update, tags and ingredients for the whole
+    batch are resolved at once, and nested lists given for an existing
+    recipe replace its current links. Returns the recipes in input order
+    with tags and ingredients prefetched.
+    """
+    recipes, creates, updates, update_fields = [], [], [], set()
+    for instance, data in items:
+        data = dict(data)
+        links = {name: data.pop(name, None) for name, model in RECIPE_LINKS}
+        if instance is None:
+            recipe = Recipe(user=user, **data)
+            creates.append(recipe)
+        else:
+            recipe = instance
+            for attr, value in data.items():
+                setattr(recipe, attr, value)
+            update_fields.update(data)
+            updates.append(recipe)
+        recipes.append((recipe, links))
+
+    if creates:
+        Recipe.objects.bulk_create(creates)
+    if updates and update_fields:
+        Recipe.objects.bulk_update(updates, sorted(update_fields))
+
+    updated_ids = {recipe.id for recipe in updates}
+    for field_name, model in RECIPE_LINKS:
+        given = [
+            (recipe, links[field_name])
+            for recipe, links in recipes
+            if links[field_name] is not None
+        ]
+        objs = get_or_create_by_name(
+            model,
+            user,
+            [item['name'] for recipe, nested in given for item in nested],
+        )
+        set_recipe_links(
+            field_name,
+            [recipe.id for recipe, nested in given if recipe.id in updated_ids],
+            [
+                (recipe.id, objs[item['name']].id)
+                for recipe, nested in given
+                for item in nested
+            ],
+        )
+
+    # bulk writes send no model signals
+    recipe_ids = [recipe.id for recipe, links in recipes]
+    update_search_vectors(recipe_ids)
+    bump_data_version(user.id)
+
+    saved = Recipe.objects.filter(
+        id__in=recipe_ids,
+    ).prefetch_related('tags', 'ingredients').in_bulk()
+    return [saved[recipe.id] for recipe, links in recipes]
@@ -0,0 +1,246 @@
+"""Per-user versioned response caching for the recipe API.
+
+Every user has a data version that is bumped whenever one of their
+recipes, tags or ingredients changes. It is a counter in the shared cache,
+started from the clock and only ever incremented, so it keeps increasing
+whichever host bumps it. Cached list bodies are keyed by that
+version, so a write makes all of the user's cached lists unreachable
+without having to find and delete them.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+
+def _cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_data_version(user_id):
+    """Return the current data version for a user."""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_data_version(user_id):
+    """Async variant of get_data_version()."""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def _written_key(user_id):
+    return f'recipe:written:{user_id}'
+
+
+def recently_written(user_id):
+    """Return whether the user's data changed in the last
+    DB_REPLICA_STICKY_SECONDS.
+
+    The marker's expiry is kept by the cache server, so the clocks of the
+    hosts that write and read it do not matter.
+    """
+    return _cache().get(_written_key(user_id)) is not None
+
+
+def _set_data_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the user has no version yet, or it was evicted
+        cache.add(key, time.time_ns(), timeout=None)
+        cache.incr(key)
+    if settings.DB_REPLICA_STICKY_SECONDS > 0:
+        cache.set(_written_key(user_id), True, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def bump_data_version(user_id):
+    """Invalidate everything cached for a user.
+
+    The version is bumped immediately and again once the current
+    transaction commits, so a reader that cached uncommitted-old data in
+    between cannot have it served under the final version. The user is
+    also marked as recently written for the replica routing.
+    """
+    _set_data_version(user_id)
+    transaction.on_commit(lambda: _set_data_version(user_id))
+
+
+def _response_key(request, version, basename):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'recipe:response:{request.user.id}:{version}:{basename}:{path}'
+
+
+class DataVersionMixin:
+    """Read the user's data version once per request."""
+
+    # Read the version before the data so a concurrent write can only make
+    # a response newer than its version, never older.
+
+    def get_data_version(self):
+        """Return the data version of the authenticated user."""
+        if not hasattr(self, '_data_version'):
+            self._data_version = get_data_version(self.request.user.id)
+        return self._data_version
+
+    async def aget_data_version(self):
+        """Async variant of get_data_version()."""
+        if not hasattr(self, '_data_version'):
+            self._data_version = await aget_data_version(self.request.user.id)
+        return self._data_version
+
+
+class VersionedListCacheMixin(DataVersionMixin):
+    """Serve list responses from a cache keyed by user and data version."""
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list body, computing it on a miss."""
+        key = _response_key(request, self.get_data_version(), self.basename)
+        cache = _cache()
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        """Async variant of list()."""
+        version = await self.aget_data_version()
+        key = _response_key(request, version, self.basename)
+        cache = _cache()
+
+        data = await cache.aget(key)
+        if data is not None:
+            return Response(data)
+
+        response = await super().alist(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin(DataVersionMixin):
+    """Answer list with 304 when the user's data is unchanged.
+
+    The ETag comes from the data version alone, so a matching If-None-Match
+    skips the queries and serialization. No Last-Modified is sent, as it
+    would compare times from hosts whose clocks can disagree.
+    """
+
+    def _etag(self, request, version):
+        renderer = request.accepted_renderer.format
+        return quote_etag(f'{request.user.id}-{version}-{renderer}')
+
+    def _patch_validators(self, response, etag):
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def _object_exists(self):
+        return True
+
+    async def _aobject_exists(self):
+        return True
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag = self._etag(request, self.get_data_version())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        elif not self._object_exists():
+            raise Http404
+        return self._patch_validators(response, etag)
+
+    async def _aconditional(self, handler, request, *args, **kwargs):
+        version = await self.aget_data_version()
+        etag = self._etag(request, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        elif not await self._aobject_exists():
+            raise Http404
+        return self._patch_validators(response, etag)
+
+    def list(self, request, *args, **kwargs):
+        """Return the list, or 304 if the client's copy is current."""
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        """Async variant of list()."""
+        return await self._aconditional(
+            super().alist, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Answer list and retrieve with 304 when the user's data is unchanged.
+
+    The data version covers all of the user's objects, so before a detail
+    304 an existence query makes sure the id is one of them.
+    """
+
+    def _lookup_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return queryset.filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).order_by()
+
+    def _object_exists(self):
+        if self.action != 'retrieve':
+            return True
+        try:
+            return self._lookup_queryset().exists()
+        except (TypeError, ValueError, ValidationError):
+            return False
+
+    async def _aobject_exists(self):
+        if self.action != 'retrieve':
+            return True
+        try:
+            return await self._lookup_queryset().aexists()
+        except (TypeError, ValueError, ValidationError):
+            return False
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the object, or 304 if the client's copy is current."""
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Async variant of retrieve()."""
+        return await self._aconditional(
+            super().aretrieve, request, *args, **kwargs
+        )
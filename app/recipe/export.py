@@ -0,0 +1,87 @@
+"""Streaming export of a user's recipes as NDJSON or CSV."""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+CSV_FIELDS = (
+    'id',
+    'title',
+    'description',
+    'time_minutes',
+    'price',
+    'link',
+    'tags',
+    'ingredients',
+    'image',
+)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render one JSON document per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=JSONEncoder) + '\n').encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """Render a flat object, such as an error, as a CSV row."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        buffer = _Echo()
+        writer = csv.writer(buffer)
+        return (
+            writer.writerow(data.keys()) + writer.writerow(data.values())
+        ).encode()
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(recipes, serializer):
+    """Yield one JSON line per recipe."""
+    encoder = JSONEncoder()
+    for recipe in recipes:
+        yield encoder.encode(serializer.to_representation(recipe)) + '\n'
+
+
+def iter_csv(recipes, serializer):
+    """Yield a header row and one CSV row per recipe."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for recipe in recipes:
+        data = serializer.to_representation(recipe)
+        data['tags'] = ';'.join(tag['name'] for tag in data['tags'])
+        data['ingredients'] = ';'.join(
+            ingredient['name'] for ingredient in data['ingredients']
+        )
+        yield writer.writerow(data.get(field) for field in CSV_FIELDS)
+
+
+async def aiter_chunks(rows, size):
+    """Yield the rows of a sync iterator joined ``size`` at a time.
+
+    Each batch is read in the sync thread, so under ASGI the response
+    streams without blocking the event loop. Django would otherwise read
+    a sync iterator into a list before sending any of it.
+    """
+    read_batch = sync_to_async(lambda: list(islice(rows, size)))
+    while batch := await read_batch():
+        yield ''.join(batch)
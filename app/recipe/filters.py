@@ -0,0 +1,64 @@
+"""Tag and ingredient filtering for the recipe list."""
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from recipe.bulk import recipe_through
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+# largest id a bigint primary key can hold
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_ids(param, value):
+    """Parse a comma separated list of ids, raising a 400 on bad input."""
+    try:
+        ids = list(dict.fromkeys(int(str_id) for str_id in value.split(',')))
+    except ValueError:
+        raise ValidationError({param: 'Expected a comma separated list of ids.'})
+    if any(id_ < 1 or id_ > MAX_ID for id_ in ids):
+        raise ValidationError(
+            {param: f'Ids must be integers from 1 to {MAX_ID}.'}
+        )
+    if len(ids) > settings.RECIPE_FILTER_MAX_IDS:
+        raise ValidationError(
+            {param: f'At most {settings.RECIPE_FILTER_MAX_IDS} ids are allowed.'}
+        )
+    return ids
+
+
+def parse_flag(param, value):
+    """Parse a 0/1 query parameter, raising a 400 on bad input."""
+    if value not in ('0', '1'):
+        raise ValidationError({param: 'Expected 0 or 1.'})
+    return value == '1'
+
+
+def parse_match(value):
+    """Validate the ``match`` mode of the id filters."""
+    if value not in (MATCH_ANY, MATCH_ALL):
+        raise ValidationError({'match': f"Expected '{MATCH_ANY}' or '{MATCH_ALL}'."})
+    return value
+
+
+def filter_linked(queryset, field_name, ids, match=MATCH_ANY):
+    """Filter recipes linked to any or all of ``ids`` through ``field_name``.
+
+    The filters are subqueries on the M2M table rather than joins, so each
+    recipe is returned once: 'any' is an EXISTS, 'all' a GROUP BY recipe
+    HAVING every id. Both are served by the (target, recipe) index.
+    """
+    through, source, target = recipe_through(field_name)
+    links = through.objects.filter(**{f'{target}__in': ids})
+    if match == MATCH_ANY:
+        return queryset.filter(Exists(links.filter(**{source: OuterRef('pk')})))
+
+    matching = (
+        links.values(source)
+        .annotate(matched=Count(target))
+        .filter(matched=len(ids))
+        .values(source)
+    )
+    return queryset.filter(pk__in=matching)
@@ -0,0 +1,98 @@
+"""Pagination for the recipe API."""
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first.
+
+    Pages are fetched with ``WHERE id < <cursor>`` on the ``-id`` ordering
+    rather than OFFSET, so every page costs the same to load. A view's
+    ``cursor_ordering`` of several fields, such as search's rank then id,
+    puts all of them in the cursor and seeks past the whole tuple, so ties
+    on the first field need no OFFSET either.
+    """
+    ordering = '-id'
+    page_size = settings.RECIPE_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPE_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Use the view's ``cursor_ordering`` when it sets one (search)."""
+        return getattr(view, 'cursor_ordering', None) or super().get_ordering(
+            request, queryset, view,
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        if len(ordering) == 1:
+            return super().paginate_queryset(queryset, request, view)
+
+        # CursorPagination only seeks on the first field; this is its
+        # paging with a seek on all of them
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = ordering
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(ordering))
+        else:
+            queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._seek(ordering, position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None or offset > 0
+            self.has_previous = following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next = following is not None
+            self.has_previous = position is not None or offset > 0
+            self.next_position, self.previous_position = following, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _seek(self, ordering, position, reverse):
+        """Return the filter for rows past ``position`` in ``ordering``."""
+        values = position.split(',')
+        if len(values) != len(ordering):
+            raise ValueError(position)
+
+        conditions = []
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            conditions.append(equal & Q(**{f'{name}__{lookup}': value}))
+            equal &= Q(**{name: value})
+        return reduce(operator.or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        return ','.join(
+            str(getattr(instance, field.lstrip('-'))) for field in ordering
+        )
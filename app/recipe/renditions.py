@@ -0,0 +1,137 @@
+"""Background rendering of resized variants of recipe images."""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from recipe.cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def image_storage():
+    """Return the storage recipe images and their renditions live in."""
+    return Recipe._meta.get_field('image').storage
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_RENDITION_WORKERS,
+            thread_name_prefix='renditions',
+        )
+    return _executor
+
+
+def rendition_name(name, rendition, image_format):
+    """Return the storage name of a rendition of the image ``name``."""
+    base = os.path.splitext(name)[0]
+    return f'{base}_{rendition}.{image_format.lower()}'
+
+
+def render(name):
+    """Write every configured rendition of an image, return {rendition: name}.
+
+    The image is decoded once, at reduced scale when the format allows it
+    (JPEG draft mode), and each rendition is resized from that copy. Image
+    names are content hashes, so renditions that already exist were made
+    from the same content and are reused.
+    """
+    storage = image_storage()
+    renditions = {
+        rendition: rendition_name(name, rendition, image_format)
+        for rendition, (size, image_format)
+        in settings.RECIPE_IMAGE_RENDITIONS.items()
+    }
+    if all(storage.exists(path) for path in renditions.values()):
+        return renditions
+
+    largest = max(size for size, fmt in settings.RECIPE_IMAGE_RENDITIONS.values())
+    with storage.open(name) as original:
+        with Image.open(original) as image:
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for rendition, (size, image_format) in settings.RECIPE_IMAGE_RENDITIONS.items():
+        copy = image.copy()
+        copy.thumbnail((size, size))
+        buffer = io.BytesIO()
+        copy.save(buffer, format=image_format, quality=85)
+        renditions[rendition] = storage.save(
+            renditions[rendition], ContentFile(buffer.getvalue()),
+        )
+    return renditions
+
+
+def render_recipe_image(recipe_id, user_id, name):
+    """Render an uploaded image and attach the renditions to the recipe."""
+    try:
+        renditions = render(name)
+    except Exception:
+        logger.exception('Rendering %s for recipe %s failed', name, recipe_id)
+        return
+    # the image may have been replaced while we were rendering
+    updated = Recipe.objects.filter(id=recipe_id, image=name).update(
+        renditions=renditions,
+    )
+    if updated:
+        bump_data_version(user_id)
+
+
+def _render_in_worker(*args):
+    close_old_connections()
+    try:
+        render_recipe_image(*args)
+    finally:
+        close_old_connections()
+
+
+def queue_renditions(recipe):
+    """Render the recipe's image once the upload commits.
+
+    Rendering runs on a thread pool (Pillow releases the GIL while
+    decoding and resizing), or inline when IMAGE_RENDITION_WORKERS is 0.
+    Queued jobs are lost when the process exits; the rebuild_renditions
+    command renders the images left without renditions.
+    """
+    args = (recipe.id, recipe.user_id, recipe.image.name)
+    if settings.IMAGE_RENDITION_WORKERS:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_render_in_worker, *args)
+        )
+    else:
+        transaction.on_commit(lambda: render_recipe_image(*args))
+
+
+def release_image(name):
+    """Delete an image and its renditions once no recipe references it.
+
+    Files are shared by every recipe with the same image content, so the
+    recipes table is the reference count. Files reused within the storage
+    grace period are kept, as a concurrent upload may be about to commit a
+    new reference to them.
+    """
+    storage = image_storage()
+    if not name or Recipe.objects.filter(image=name).exists():
+        return
+    if storage.recently_used(name):
+        return
+
+    storage.delete(name)
+    for rendition, (size, image_format) in settings.RECIPE_IMAGE_RENDITIONS.items():
+        storage.delete(rendition_name(name, rendition, image_format))
+
+
+def queue_release(name):
+    """Release an image no longer referenced by a recipe after commit."""
+    if name:
+        transaction.on_commit(lambda: release_image(name))
@@ -0,0 +1,87 @@
+"""Full-text search over recipes.
+
+On PostgreSQL each recipe stores a weighted ``tsvector`` document (title A,
+description B, tag and ingredient names C) in ``Recipe.search_vector``,
+indexed with GIN and refreshed by the write paths, and results are ranked
+with ``ts_rank``. Other databases fall back to unranked substring matching.
+"""
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast
+
+from core.models import Ingredient, Recipe, Tag
+
+# models whose names are part of the search document
+LINKED_MODELS = (Tag, Ingredient)
+
+# cursor ordering of ranked results; both values go in the cursor
+RANKED_ORDERING = ('-search_rank', '-id')
+
+
+def search_enabled(using='default'):
+    """Return True if the database supports the tsvector documents."""
+    return connections[using].vendor == 'postgresql'
+
+
+def search_document():
+    """Return the expression computing a recipe's search document."""
+    config = settings.RECIPE_SEARCH_CONFIG
+    document = (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+    if settings.RECIPE_SEARCH_INCLUDE_LINKS:
+        for model in LINKED_MODELS:
+            names = (
+                model.objects.filter(recipe=OuterRef('pk'))
+                .values('recipe')
+                .annotate(names=StringAgg('name', ' '))
+                .values('names')
+            )
+            document += SearchVector(Subquery(names), weight='C', config=config)
+    return document
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the search documents of some recipes in one UPDATE.
+
+    ``recipe_ids`` may be a list or a queryset of ids, which is used as a
+    subquery rather than evaluated. Does nothing when it is None or on
+    databases without full-text search.
+    """
+    if recipe_ids is None or not search_enabled():
+        return
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        search_vector=search_document(),
+    )
+
+
+def search_recipes(queryset, q):
+    """Filter recipes matching the search ``q``.
+
+    Returns the queryset and the ordering to paginate it with, or None to
+    keep the default one.
+    """
+    if search_enabled(queryset.db):
+        query = SearchQuery(
+            q, config=settings.RECIPE_SEARCH_CONFIG, search_type='websearch',
+        )
+        # ts_rank is a real; as double precision the rank in a cursor is
+        # compared exactly with the rank it was read from
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        )
+        return queryset, RANKED_ORDERING
+
+    for term in q.split():
+        matches = Q(title__icontains=term) | Q(description__icontains=term)
+        if settings.RECIPE_SEARCH_INCLUDE_LINKS:
+            for model in LINKED_MODELS:
+                matches |= Exists(model.objects.filter(
+                    recipe=OuterRef('pk'), name__icontains=term,
+                ))
+        queryset = queryset.filter(matches)
+    return queryset, None
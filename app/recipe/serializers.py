@@ -1,6 +1,14 @@
 """serializers for recipe API View."""
+from django.conf import settings
+from django.db import transaction
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from PIL import Image
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
+from recipe import bulk
+from recipe.renditions import image_storage, queue_release, queue_renditions
+from recipe.search import update_search_vectors
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredient objects."""
@@ -10,6 +18,14 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of recipes using them."""
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
+        read_only_fields = ('id', 'recipe_count')
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag objects."""
     class Meta:
@@ -17,6 +33,14 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them."""
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+        read_only_fields = ('id', 'recipe_count')
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for the recipe object."""
     tags=TagSerializer(many=True, required=False)
@@ -34,24 +58,27 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_attrs(self, field_name, model, items, recipe):
+        """Resolve items by name for the user and make them the recipe's."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        objs = bulk.get_or_create_by_name(
+            model,
+            auth_user,
+            [item['name'] for item in items],
+        )
+        bulk.set_recipe_links(
+            field_name,
+            [recipe.id],
+            [(recipe.id, obj.id) for obj in objs.values()],
+        )
+
+    def _get_or_create_tags(self, tags, recipe):
+        self._get_or_create_attrs('tags', Tag, tags, recipe)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        self._get_or_create_attrs('ingredients', Ingredient, ingredients, recipe)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
@@ -60,19 +87,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(user=auth_user,**validated_data)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
+        if tags or ingredients:
+            # the links are bulk inserted after the post_save refresh
+            update_search_vectors([recipe.id])
 
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update and return a recipe."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
             self._get_or_create_tags(tags, instance)
         if ingredients is not None:
-            instance.ingredients.clear()
             self._get_or_create_ingredients(ingredients, instance)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -80,16 +109,88 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
+@extend_schema_field(OpenApiTypes.OBJECT)
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of the resized variants of a recipe image, once rendered."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for name, path in (value or {}).items():
+            url = image_storage().url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class ImageUploadField(serializers.FileField):
+    """Image upload checked from its header, without decoding any pixels.
+
+    Pillow only parses the header when opening an image, so format, size
+    and dimensions are known before the pixel data is read; the file itself
+    is already on disk (see HashingUploadHandler).
+    """
+    default_error_messages = {
+        'invalid_image': 'Upload a valid image. The file you uploaded was '
+                         'either not an image or a corrupted image.',
+        'invalid_format': 'Unsupported image format {format}, use one of {formats}.',
+        'max_bytes': 'Images may be at most {max_bytes} bytes.',
+        'max_dimension': 'Images may be at most {max_dimension} pixels on a side.',
+        'max_pixels': 'Images may be at most {max_pixels} pixels.',
+    }
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        if file.size > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.fail('max_bytes', max_bytes=settings.RECIPE_IMAGE_MAX_BYTES)
+
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.fail('max_pixels', max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        except (OSError, SyntaxError, ValueError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+
+        if image_format not in settings.RECIPE_IMAGE_FORMATS:
+            self.fail(
+                'invalid_format',
+                format=image_format,
+                formats=', '.join(settings.RECIPE_IMAGE_FORMATS),
+            )
+        if max(width, height) > settings.RECIPE_IMAGE_MAX_DIMENSION:
+            self.fail('max_dimension', max_dimension=settings.RECIPE_IMAGE_MAX_DIMENSION)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail('max_pixels', max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+        return file
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for the recipe detail object."""
+    renditions = RenditionsField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ('description','image')
+        fields = RecipeSerializer.Meta.fields + ('description','image', 'renditions')
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image = ImageUploadField()
+    renditions = RenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'renditions')
         read_only_fields = ('id',)
-        extra_kwargs = {  'image': {'required': True}  }
+
+    def update(self, instance, validated_data):
+        """Save the new image, queue its renditions and release the old one."""
+        previous = instance.image.name
+        instance.renditions = None
+        recipe = super().update(instance, validated_data)
+        queue_renditions(recipe)
+        if previous != recipe.image.name:
+            queue_release(previous)
+        return recipe
 
@@ -0,0 +1,146 @@
+"""Signal handlers keeping recipe caches, counts, files and search in step with writes."""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import bulk
+from recipe.cache import bump_data_version
+from recipe.renditions import queue_release
+from recipe.search import search_enabled, update_search_vectors
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_changed(sender, instance, **kwargs):
+    """Bump the owner's data version after a write."""
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Release the deleted recipe's image file if no other recipe uses it."""
+    queue_release(instance.image.name)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, **kwargs):
+    """Bump the owner's data version after tags/ingredients are relinked."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_data_version(instance.user_id)
+
+
+LINK_FIELDS = {
+    Recipe.tags.through: 'tags',
+    Recipe.ingredients.through: 'ingredients',
+}
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_counted(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the recipe_count of relinked tags/ingredients up to date.
+
+    Removals are counted before the rows go, as remove() is also sent ids
+    that were never linked.
+    """
+    field_name = LINK_FIELDS[sender]
+    through, source, target = bulk.recipe_through(field_name)
+    # the side of the links the signal was sent from, and the other one
+    own, other = (target, source) if reverse else (source, target)
+
+    if action in ('pre_remove', 'pre_clear'):
+        links = through.objects.filter(**{own: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other}__in': pk_set})
+        unlinked = instance.__dict__.setdefault('_unlinked', {})
+        unlinked[field_name] = list(links.values_list(target, flat=True))
+        return
+    if action == 'post_add':
+        obj_ids = [instance.pk] * len(pk_set) if reverse else pk_set
+        bulk.adjust_recipe_counts(field_name, Counter(obj_ids))
+    elif action in ('post_remove', 'post_clear'):
+        obj_ids = instance._unlinked.pop(field_name)
+        bulk.adjust_recipe_counts(
+            field_name,
+            {obj_id: -count for obj_id, count in Counter(obj_ids).items()},
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Uncount a recipe from its tags/ingredients before its links cascade."""
+    for field_name, model in bulk.RECIPE_LINKS:
+        through, source, target = bulk.recipe_through(field_name)
+        obj_ids = through.objects.filter(**{source: instance.pk}).values_list(
+            target, flat=True,
+        )
+        bulk.adjust_recipe_counts(field_name, {obj_id: -1 for obj_id in obj_ids})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    """Refresh the search document of a saved recipe."""
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        update_search_vectors([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_searched(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh the search documents of relinked recipes."""
+    if not (search_enabled() and settings.RECIPE_SEARCH_INCLUDE_LINKS):
+        return
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors([instance.id])
+    elif action == 'pre_clear':
+        _remember_recipes(instance)
+    elif action == 'post_clear':
+        update_search_vectors(instance._search_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(list(pk_set))
+
+
+def _remember_recipes(instance):
+    """Save the recipe ids of a tag/ingredient before its links go away."""
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Refresh the search documents of recipes using a renamed tag/ingredient."""
+    if not created and settings.RECIPE_SEARCH_INCLUDE_LINKS:
+        update_search_vectors(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Remember the recipes of a tag/ingredient about to be deleted."""
+    if search_enabled() and settings.RECIPE_SEARCH_INCLUDE_LINKS:
+        _remember_recipes(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Drop a deleted tag/ingredient from its recipes' search documents."""
+    update_search_vectors(getattr(instance, '_search_recipe_ids', None))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, **kwargs):
+    """Start new users on a fresh version in case their id is reused."""
+    if created:
+        bump_data_version(instance.id)
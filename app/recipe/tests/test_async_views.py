@@ -0,0 +1,127 @@
+"""Tests for the async read handlers of the recipe API."""
+import inspect
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Recipe, Tag
+from recipe import urls, views
+from recipe.async_views import async_urlpatterns
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+recipe_list = views.RecipeViewSet.as_async_view(
+    {'get': 'list', 'post': 'create'},
+    basename='recipe',
+    detail=False,
+)
+recipe_detail = views.RecipeViewSet.as_async_view(
+    {'get': 'retrieve', 'patch': 'partial_update'},
+    basename='recipe',
+    detail=True,
+)
+tag_list = views.TagViewSet.as_async_view(
+    {'get': 'list'},
+    basename='tag',
+    detail=False,
+)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class AsyncViewTests(TestCase):
+    """Test the async views match the sync API."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+
+    def call(self, view, method, path, data=None, **kwargs):
+        request = getattr(self.factory, method)(path, data, format='json')
+        force_authenticate(request, user=self.user)
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_list(self):
+        """Test listing recipes with tags prefetched."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.call(recipe_list, 'get', '/api/recipe/recipes/')
+
+        serializer = RecipeSerializer([recipe], many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve(self):
+        """Test retrieving a recipe."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.call(recipe_detail, 'get', '/', pk=recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_retrieve_other_user_not_found(self):
+        """Test recipes of other users are not found."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        recipe = create_recipe(user=other)
+
+        res = self.call(recipe_detail, 'get', '/', pk=recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unauthenticated(self):
+        """Test authentication is still required."""
+        request = self.factory.get('/api/recipe/recipes/')
+
+        res = async_to_sync(recipe_list)(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_attr_list(self):
+        """Test listing tags without pagination."""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.call(tag_list, 'get', '/api/recipe/tags/')
+
+        self.assertEqual(res.data[0]['name'], 'Vegan')
+
+    def test_writes_use_sync_actions(self):
+        """Test non-read methods are delegated to the sync viewset."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.call(
+            recipe_detail, 'patch', '/', {'title': 'New'}, pk=recipe.id,
+        )
+
+        recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.title, 'New')
+
+    def test_async_urlpatterns(self):
+        """Test only routes with a GET action are swapped."""
+        patterns = async_urlpatterns(urls.router.urls)
+
+        by_name = {p.name: p.callback for p in patterns}
+        self.assertTrue(inspect.iscoroutinefunction(by_name['recipe-list']))
+        self.assertTrue(inspect.iscoroutinefunction(by_name['tag-list']))
+        self.assertFalse(inspect.iscoroutinefunction(by_name['tag-detail']))
+        self.assertFalse(inspect.iscoroutinefunction(by_name['recipe-export']))
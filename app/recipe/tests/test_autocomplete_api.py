@@ -0,0 +1,100 @@
+"""Tests for the tag and ingredient autocomplete."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import autocomplete
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+def create_user(email='user@example.com', password='test123'):
+    """create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class AutocompleteApiTests(TestCase):
+    """Test prefix autocomplete of tags and ingredients."""
+
+    def setUp(self):
+        autocomplete._indexes.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.vegetarian = Tag.objects.create(user=self.user, name='vegetarian')
+        Tag.objects.create(user=self.user, name='Dessert')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price=Decimal('4.00'),
+        )
+        recipe.tags.add(self.vegetarian)
+
+    def names(self, url=TAGS_AUTOCOMPLETE_URL, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_prefix_case_insensitive_ranked_by_usage(self):
+        """Test matches ignore case and the most used come first."""
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'VEG'})
+
+        self.assertEqual(res.data, [
+            {'id': self.vegetarian.id, 'name': 'vegetarian', 'recipe_count': 1},
+            {'id': self.vegan.id, 'name': 'Vegan', 'recipe_count': 0},
+        ])
+
+    def test_limit(self):
+        """Test the number of results is capped."""
+        self.assertEqual(self.names(prefix='veg', limit=1), ['vegetarian'])
+
+        for limit in (0, 51, 'ten'):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'v', 'limit': limit})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_prefix(self):
+        """Test an empty prefix matches nothing."""
+        self.assertEqual(self.names(prefix=''), [])
+
+    def test_limited_to_user(self):
+        """Test other users' items are not suggested."""
+        other = create_user(email='other@example.com')
+        Tag.objects.create(user=other, name='Veggie')
+
+        self.assertEqual(self.names(prefix='veggie'), [])
+
+    def test_served_from_memory(self):
+        """Test repeated keystrokes do not query the database."""
+        self.names(prefix='v')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(prefix='ve'), ['vegetarian', 'Vegan'])
+
+    def test_refreshed_on_write(self):
+        """Test new and renamed items are suggested after a write."""
+        self.names(prefix='v')
+        Tag.objects.create(user=self.user, name='Very spicy')
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+
+        self.assertEqual(self.names(prefix='v'), ['vegetarian', 'Very spicy'])
+
+    @override_settings(AUTOCOMPLETE_MAX_ITEMS=2)
+    def test_database_fallback(self):
+        """Test users with too many items are searched in the database."""
+        self.assertEqual(self.names(prefix='VEG'), ['vegetarian', 'Vegan'])
+
+    def test_ingredients(self):
+        """Test ingredients are autocompleted too."""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, prefix='sa'), ['Salt'],
+        )
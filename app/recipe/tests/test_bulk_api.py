@@ -0,0 +1,184 @@
+"""Tests for the bulk recipe API."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+BULK_URL = reverse('recipe:recipe-bulk')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def recipe_payload(index, tags=(), ingredients=()):
+    """Return a sample recipe payload."""
+    return {
+        'title': f'Recipe {index}',
+        'time_minutes': 10,
+        'price': '5.00',
+        'tags': [{'name': name} for name in tags],
+        'ingredients': [{'name': name} for name in ingredients],
+    }
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test creating and updating recipes in bulk."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating recipes with shared tags and ingredients."""
+        payload = [
+            recipe_payload(1, tags=['Vegan'], ingredients=['Salt']),
+            recipe_payload(2, tags=['Vegan', 'Lunch'], ingredients=['Salt']),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['title'] for item in res.data['results']],
+            ['Recipe 1', 'Recipe 2'],
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data['results'][1]['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_bulk_create_constant_queries(self):
+        """Test the number of queries does not grow with the batch."""
+        small = [recipe_payload(i, tags=[f'T{i}']) for i in range(2)]
+        large = [recipe_payload(i, tags=[f'T{i}']) for i in range(50)]
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(BULK_URL, small, format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            res = self.client.post(BULK_URL, large, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_bulk_update(self):
+        """Test items with an id update that recipe and replace its tags."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Old',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old tag'))
+        payload = [{'id': recipe.id, 'title': 'New', 'tags': [{'name': 'New tag'}]}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.time_minutes, 5)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)),
+            ['New tag'],
+        )
+
+    def test_duplicate_id_reported(self):
+        """Test an id sent twice is reported as a duplicate."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Old',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        payload = [{'id': recipe.id, 'title': 'A'}, {'id': recipe.id, 'title': 'B'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['errors'],
+            [{'index': 1, 'errors': {'id': ['Duplicate id.']}}],
+        )
+
+    def test_invalid_item_fails_batch(self):
+        """Test nothing is written when an item is invalid."""
+        payload = [recipe_payload(1), {'title': 'Missing fields'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_allow_partial(self):
+        """Test valid items are written and errors reported per item."""
+        payload = [recipe_payload(1), {'title': 'Missing fields'}]
+
+        res = self.client.post(
+            f'{BULK_URL}?allow_partial=1', payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('price', res.data['errors'][0]['errors'])
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_invalid_allow_partial(self):
+        """Test a non 0/1 allow_partial is a 400, and nothing is written."""
+        payload = [recipe_payload(1)]
+
+        res = self.client.post(
+            f'{BULK_URL}?allow_partial=yes', payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('allow_partial', res.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_other_users_recipe_not_updated(self):
+        """Test ids of other users' recipes are reported as not found."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Theirs',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+
+        res = self.client.post(
+            BULK_URL, [{'id': recipe.id, 'title': 'Mine'}], format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data['errors'][0]['errors'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Theirs')
+
+    def test_list_reflects_bulk_write(self):
+        """Test the cached recipe list is invalidated by a bulk write."""
+        self.client.get(RECIPE_URL)
+
+        self.client.post(BULK_URL, [recipe_payload(1)], format='json')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_expects_list(self):
+        """Test a non-list body is rejected."""
+        res = self.client.post(BULK_URL, recipe_payload(1), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
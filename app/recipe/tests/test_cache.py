@@ -0,0 +1,246 @@
+"""Tests for the versioned recipe API response cache."""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import bump_data_version, get_data_version, recently_written
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class DataVersionTests(TestCase):
+    """Test per-user data versions."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_stable_until_bumped(self):
+        """Test the version only changes when bumped."""
+        version = get_data_version(1)
+        self.assertEqual(get_data_version(1), version)
+
+        bump_data_version(1)
+
+        self.assertNotEqual(get_data_version(1), version)
+
+    def test_version_increases_with_clock_behind(self):
+        """Test bumps from a host with a slower clock still raise the version."""
+        versions = [get_data_version(1)]
+        with patch('recipe.cache.time.time_ns', return_value=0):
+            for _ in range(2):
+                bump_data_version(1)
+                versions.append(get_data_version(1))
+
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_versions_per_user(self):
+        """Test bumping one user leaves the others alone."""
+        other = get_data_version(2)
+
+        bump_data_version(1)
+
+        self.assertEqual(get_data_version(2), other)
+
+
+    @override_settings(DB_REPLICA_STICKY_SECONDS=60)
+    def test_recently_written_ignores_clock(self):
+        """Test a write marks the user however far behind the clock is."""
+        with patch('recipe.cache.time.time_ns', return_value=0):
+            bump_data_version(1)
+
+        self.assertTrue(recently_written(1))
+        self.assertFalse(recently_written(2))
+
+class ResponseCacheTests(TestCase):
+    """Test cached list responses are served and never go stale."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list is served without touching the database."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_invalidates(self):
+        """Test creating a recipe is visible on the next list."""
+        self.client.get(RECIPE_URL)
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '2.00'}
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_nested_update_invalidates(self):
+        """Test changing recipe tags through the API is visible."""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        payload = {'tags': [{'name': 'Vegan'}]}
+        self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+    def test_m2m_change_invalidates(self):
+        """Test linking an ingredient outside the API is visible."""
+        recipe = create_recipe(user=self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(RECIPE_URL)
+
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 1)
+
+    def test_tag_rename_invalidates(self):
+        """Test renaming a tag is visible on the tag list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]['name'], 'Vegetarian')
+
+    def test_cache_per_user(self):
+        """Test users never see each other's cached lists."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        create_recipe(user=other)
+        client = APIClient()
+        client.force_authenticate(other)
+        client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag handling on the recipe endpoints."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match returns 304 without queries."""
+        res = self.client.get(RECIPE_URL)
+        etag = res.headers['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.headers['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """Test a matching If-None-Match on a recipe detail returns 304."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url).headers['ETag']
+
+        # only the check that the recipe is still the user's
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_not_modified_needs_own_recipe(self):
+        """Test a matching ETag on a missing or another user's recipe is 404."""
+        etag = self.client.get(detail_url(self.recipe.id)).headers['ETag']
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        # writes by another user leave this user's ETag valid
+        other_recipe = create_recipe(user=other_user)
+
+        for recipe_id in (other_recipe.id, other_recipe.id + 1):
+            res = self.client.get(detail_url(recipe_id), HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_not_modified(self):
+        """Test a matching If-None-Match on the tag list returns 304."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL).headers['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """Test a write makes the old ETag stale."""
+        etag = self.client.get(RECIPE_URL).headers['ETag']
+        self.recipe.title = 'Changed'
+        self.recipe.save()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.headers['ETag'], etag)
+
+    def test_no_last_modified(self):
+        """Test only an ETag is sent, so If-Modified-Since alone never 304s."""
+        res = self.client.get(RECIPE_URL)
+        self.assertNotIn('Last-Modified', res.headers)
+
+        res = self.client.get(
+            RECIPE_URL,
+            HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2101 00:00:00 GMT',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_private_cache_headers(self):
+        """Test responses must be revalidated and vary on credentials."""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertIn('private', res.headers['Cache-Control'])
+        self.assertIn('no-cache', res.headers['Cache-Control'])
+        self.assertIn('Authorization', res.headers['Vary'])
@@ -0,0 +1,133 @@
+"""Tests for the streaming recipe export."""
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ExportApiTests(TestCase):
+    """Test exporting recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title='Soup')
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt'),
+            Ingredient.objects.create(user=self.user, name='Leek'),
+        )
+
+    def test_export_ndjson(self):
+        """Test recipes are streamed one JSON document per line."""
+        create_recipe(user=self.user, title='Stew')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual([r['title'] for r in recipes], ['Stew', 'Soup'])
+        self.assertEqual(recipes[1]['tags'][0]['name'], 'Vegan')
+
+    def test_export_csv(self):
+        """Test recipes are streamed as CSV with joined names."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Soup')
+        self.assertEqual(rows[0]['tags'], 'Vegan')
+        self.assertEqual(
+            sorted(rows[0]['ingredients'].split(';')),
+            ['Leek', 'Salt'],
+        )
+
+    def test_export_limited_to_user(self):
+        """Test only the user's own recipes are exported."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        create_recipe(user=other, title='Theirs')
+
+        res = self.client.get(EXPORT_URL)
+
+        content = b''.join(res.streaming_content).decode()
+        self.assertNotIn('Theirs', content)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_prefetches_per_chunk(self):
+        """Test queries grow with the number of chunks, not recipes."""
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+
+        res = self.client.get(EXPORT_URL)
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(res.streaming_content)
+
+        # one recipe query read in 3 chunks, each chunk with a tag and an
+        # ingredient query
+        self.assertEqual(len(queries), 7)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_async_under_asgi(self):
+        """Test ASGI requests get an async iterator, read chunk by chunk."""
+        for i in range(4):
+            await Recipe.objects.acreate(
+                user=self.user, title=f'Recipe {i}',
+                time_minutes=5, price=Decimal('1.00'),
+            )
+        token = await Token.objects.acreate(user=self.user)
+
+        res = await AsyncClient().get(
+            EXPORT_URL, headers={'Authorization': f'Token {token.key}'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        chunks = [chunk async for chunk in res.streaming_content]
+        # five recipes sent two at a time
+        self.assertEqual(len(chunks), 3)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[-1])['title'], 'Soup')
+
+    def test_export_requires_auth(self):
+        """Test authentication is required."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
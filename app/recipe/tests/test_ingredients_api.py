@@ -133,5 +133,20 @@ class PrivateIngredientsApiTests(TestCase):
 
         self.assertEqual(len(res.data), 1)
 
+    def test_ingredients_with_counts(self):
+        """Test with_counts includes unused ingredients with a zero count."""
+        eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        cheese = Ingredient.objects.create(user=self.user, name='Cheese')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Egg benedict',
+            time_minutes=30,
+            price=Decimal('12.00')
+        )
+        recipe.ingredients.add(eggs)
+
+        res = self.client.get(INGREDIENTS_URL, {'with_counts': 1})
 
+        counts = {item['id']: item['recipe_count'] for item in res.data}
+        self.assertEqual(counts, {eggs.id: 1, cheese.id: 0})
 
@@ -0,0 +1,100 @@
+"""Query budgets for the recipe API endpoints."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.tests.utils import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+# token lookup + recipes + prefetched tags + prefetched ingredients
+RECIPE_LIST_BUDGET = 4
+RECIPE_DETAIL_BUDGET = 4
+# token lookup + attributes
+ATTR_LIST_BUDGET = 2
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test recipe endpoints run a fixed number of queries."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            for i in range(5)
+        ]
+        self.recipes = []
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('5.00'),
+            )
+            recipe.tags.add(*self.tags)
+            recipe.ingredients.add(*self.ingredients)
+            self.recipes.append(recipe)
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes does not query per recipe."""
+        with self.assertQueryBudget(RECIPE_LIST_BUDGET):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_filtered_list_budget(self):
+        """Test filtering recipes does not query per recipe."""
+        params = {
+            'tags': f'{self.tags[0].id},{self.tags[1].id}',
+            'ingredients': f'{self.ingredients[0].id}',
+        }
+        with self.assertQueryBudget(RECIPE_LIST_BUDGET):
+            res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_detail_budget(self):
+        """Test retrieving a recipe does not query per tag/ingredient."""
+        with self.assertQueryBudget(RECIPE_DETAIL_BUDGET):
+            res = self.client.get(detail_url(self.recipes[0].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_attr_list_budget(self):
+        """Test listing tags and ingredients runs a single data query."""
+        for url in (TAGS_URL, INGREDIENTS_URL):
+            with self.assertQueryBudget(ATTR_LIST_BUDGET):
+                res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_budget_exceeded_fails(self):
+        """Test the budget helper fails when a block goes over budget."""
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                list(Recipe.objects.all())
+                list(Tag.objects.all())
@@ -1,14 +1,21 @@
 """tests for recipe APIs."""
 import tempfile
 import os
-from PIL import Image
-from django.test import TestCase
+from unittest.mock import patch
+from PIL import Image, ImageFile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from decimal import Decimal
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Ingredient, Recipe, Tag
+from recipe.pagination import RecipeCursorPagination
+from recipe.renditions import render_recipe_image
 from recipe.serializers import (RecipeSerializer,RecipeDetailSerializer)
 
 RECIPE_URL = reverse('recipe:recipe-list')
@@ -66,7 +73,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test that recipes returned are for the authenticated user."""
@@ -77,7 +84,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test retrieving a recipe detail."""
@@ -318,6 +325,44 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_nested_writes_use_constant_queries(self):
+        """Test nested tag/ingredient writes cost the same for any size."""
+        def payload(count):
+            return {
+                'title': 'Sample Recipe',
+                'time_minutes': 10,
+                'price': Decimal('5.00'),
+                'tags': [{'name': f'Tag {i}'} for i in range(count)],
+                'ingredients': [{'name': f'Ing {i}'} for i in range(count)],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(RECIPE_URL, payload(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(RECIPE_URL, payload(40), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small), len(large))
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 40)
+        self.assertEqual(recipe.ingredients.count(), 40)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 40)
+
+    def test_create_recipe_duplicate_tag_names(self):
+        """Test repeated tag names in a payload link a single tag."""
+        payload = {
+            'title': 'Sample Recipe',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+            'tags': [{'name': 'Vegan'}, {'name': 'Vegan'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipes with specific tags."""
         recipe1 = create_recipe(user=self.user, title='Recipe 1')
@@ -334,9 +379,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients."""
@@ -354,9 +399,165 @@ class PrivateRecipeApiTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_match_all(self):
+        """Test match=all returns only recipes with every given tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        both = create_recipe(user=self.user, title='Both')
+        both.tags.add(tag1, tag2)
+        one = create_recipe(user=self.user, title='One')
+        one.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'},
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']], [both.id])
+
+    def test_filter_recipes_no_duplicates(self):
+        """Test a recipe matching several ids is returned once."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_filter_recipes_invalid_params(self):
+        """Test malformed filters are rejected with a 400."""
+        for params in (
+            {'tags': '1,abc'},
+            {'ingredients': '-1'},
+            {'tags': '9223372036854775808'},
+            {'tags': '1', 'match': 'some'},
+        ):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    @override_settings(RECIPE_FILTER_MAX_IDS=3)
+    def test_filter_recipes_too_many_ids(self):
+        """Test filters with more ids than allowed are rejected."""
+        res = self.client.get(RECIPE_URL, {'tags': '1,2,3,4'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test124')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+    def test_pages_follow_cursor(self):
+        """Test walking the next links returns every recipe once, newest first."""
+        ids = []
+        url = RECIPE_URL
+        params = {'page_size': 2}
+        while url:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids.extend(item['id'] for item in res.data['results'])
+            url, params = res.data['next'], None
+
+        expected = sorted((recipe.id for recipe in self.recipes), reverse=True)
+        self.assertEqual(ids, expected)
+
+    def test_next_page_seeks_by_id(self):
+        """Test later pages filter on id instead of using OFFSET."""
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        recipe_sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('OFFSET', recipe_sql.upper())
+        self.assertIn('"id" <', recipe_sql)
+
+    def _walk(self, url, params, link):
+        """Return the ids of every page reached by following ``link``."""
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(([item['id'] for item in res.data['results']], queries))
+            last = res
+            url, params = res.data[link], None
+        return pages, last
+
+    @patch('recipe.views.search.search_recipes')
+    def test_pages_seek_past_ties(self, patched_search):
+        """Test a two-field ordering pages through ties without OFFSET."""
+        # search's (rank, id) ordering, with ties on the first field
+        patched_search.side_effect = lambda queryset, q: (
+            queryset, ('-time_minutes', '-id'),
+        )
+        for i, recipe in enumerate(self.recipes):
+            recipe.time_minutes = i % 2
+            recipe.save()
+        expected = [
+            recipe.id for recipe in sorted(
+                self.recipes, key=lambda r: (r.time_minutes, r.id), reverse=True,
+            )
+        ]
+
+        pages, last = self._walk(RECIPE_URL, {'q': 'x', 'page_size': 2}, 'next')
+
+        self.assertEqual([id_ for ids, _ in pages for id_ in ids], expected)
+        for ids, queries in pages[1:]:
+            self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'].upper())
+
+        pages, _ = self._walk(last.data['previous'], None, 'previous')
+
+        self.assertEqual(
+            [id_ for ids, _ in reversed(pages) for id_ in ids],
+            expected[:len(expected) - len(last.data['results'])],
+        )
+
+    @patch('recipe.views.search.search_recipes')
+    def test_invalid_multi_field_cursor(self, patched_search):
+        """Test a cursor not matching a two-field ordering returns 404."""
+        patched_search.side_effect = lambda queryset, q: (
+            queryset, ('-time_minutes', '-id'),
+        )
+        res = self.client.get(RECIPE_URL, {'q': 'x', 'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        next_url = res.data['next']
+
+        # a single-field cursor such as the plain list's
+        res = self.client.get(RECIPE_URL, {'q': 'x', 'cursor': 'cD0xMg=='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(next_url).status_code, status.HTTP_200_OK)
+
+    def test_page_size_capped(self):
+        """Test page_size is capped at the configured maximum."""
+        with patch.object(RecipeCursorPagination, 'max_page_size', 3):
+            res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns 404."""
+        res = self.client.get(RECIPE_URL, {'cursor': 'bogus'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class ImageUploadTests(TestCase):
     """Test for the image upload API."""
 
@@ -388,18 +589,154 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, {'image':'notimage'}, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(IMAGE_RENDITION_WORKERS=0)
+    def test_upload_image_renders_renditions(self):
+        """Test renditions are rendered after upload and exposed on detail."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (1200, 900)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {'image': image_file}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        paths = self.recipe.renditions
+        self.addCleanup(lambda: [default_storage.delete(p) for p in paths.values()])
+        self.assertEqual(set(paths), set(settings.RECIPE_IMAGE_RENDITIONS))
+        with default_storage.open(paths['thumbnail']) as thumb:
+            self.assertEqual(max(Image.open(thumb).size), 200)
+        with default_storage.open(paths['medium_webp']) as medium:
+            self.assertEqual(Image.open(medium).format, 'WEBP')
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['renditions']['medium'].startswith('http://'))
+
+    def _upload(self, recipe, color='black'):
+        """Upload a small JPEG to a recipe and return the response."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10), color).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    image_upload_url(recipe.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+
+    @override_settings(IMAGE_RENDITION_WORKERS=0)
+    def test_identical_images_share_one_file(self):
+        """Test the same image uploaded to two recipes is stored once."""
+        other = create_recipe(user=self.user)
+        self._upload(self.recipe)
+        self._upload(other)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertRegex(
+            self.recipe.image.name,
+            r'^uploads/recipe/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$',
+        )
+        folder = os.path.dirname(self.recipe.image.path)
+        self.assertEqual(
+            [name for name in os.listdir(folder) if name.endswith('.jpg')],
+            [os.path.basename(self.recipe.image.name)],
+        )
+
+    @override_settings(IMAGE_RENDITION_WORKERS=0)
+    @patch('core.files.ContentAddressedStorage.reuse_grace', -1)
+    def test_replaced_image_released(self):
+        """Test an unreferenced image is deleted when it is replaced."""
+        self._upload(self.recipe, 'black')
+        self.recipe.refresh_from_db()
+        old_path = self.recipe.image.path
+
+        self._upload(self.recipe, 'white')
+
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.path, old_path)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    @override_settings(IMAGE_RENDITION_WORKERS=0)
+    @patch('core.files.ContentAddressedStorage.reuse_grace', -1)
+    def test_shared_image_released_with_last_recipe(self):
+        """Test a shared image is kept until its last recipe is deleted."""
+        other = create_recipe(user=self.user)
+        self._upload(self.recipe)
+        self._upload(other)
+        other.refresh_from_db()
+        path = other.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def _post_image(self, image, image_format):
+        """Post an image in the given format to the recipe."""
+        with tempfile.NamedTemporaryFile() as image_file:
+            image.save(image_file, format=image_format)
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
 
+    def test_upload_validated_without_decoding(self):
+        """Test an upload is validated from its header only."""
+        with patch.object(ImageFile.ImageFile, 'load', side_effect=AssertionError):
+            res = self._post_image(Image.new('RGB', (10, 10)), 'PNG')
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_upload_unsupported_format(self):
+        """Test images in formats that are not allowed are rejected."""
+        res = self._post_image(Image.new('RGB', (10, 10)), 'GIF')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('GIF', str(res.data['image']))
 
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSION=100)
+    def test_upload_max_dimension(self):
+        """Test images wider than the limit are rejected."""
+        res = self._post_image(Image.new('L', (101, 1)), 'PNG')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_upload_max_pixels(self):
+        """Test images with more pixels than the limit are rejected."""
+        res = self._post_image(Image.new('L', (40, 40)), 'PNG')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @patch('PIL.Image.MAX_IMAGE_PIXELS', 100)
+    def test_upload_decompression_bomb(self):
+        """Test images Pillow flags as decompression bombs are rejected."""
+        res = self._post_image(Image.new('L', (40, 40)), 'PNG')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', str(res.data['image']))
 
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_max_bytes(self):
+        """Test image files larger than the limit are rejected."""
+        res = self._post_image(Image.effect_noise((64, 64), 50), 'PNG')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_stale_renditions_discarded(self):
+        """Test renditions of a replaced image are not attached."""
+        self.recipe.image = 'uploads/recipe/current.jpg'
+        self.recipe.save()
 
+        with patch('recipe.renditions.render', return_value={'medium': 'x.jpg'}):
+            render_recipe_image(self.recipe.id, self.user.id, 'uploads/recipe/old.jpg')
 
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.renditions)
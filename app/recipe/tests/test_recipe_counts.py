@@ -0,0 +1,112 @@
+"""Tests for the recipe counts of tags and ingredients."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCountTests(TestCase):
+    """Test recipe_count follows every way of relinking recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def counts(self, model=Tag):
+        return dict(
+            model.objects.filter(user=self.user).values_list('name', 'recipe_count')
+        )
+
+    def test_api_create_and_update(self):
+        """Test creating and updating recipes through the API."""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': Decimal('5.50'),
+            'tags': [{'name': 'Dinner'}, {'name': 'Spicy'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.client.post(RECIPE_URL, {**payload, 'tags': [{'name': 'Dinner'}]}, format='json')
+        self.assertEqual(self.counts(), {'Dinner': 2, 'Spicy': 1})
+        self.assertEqual(self.counts(Ingredient), {'Rice': 2})
+
+        self.client.patch(
+            detail_url(res.data['id']),
+            {'tags': [{'name': 'Dinner'}, {'name': 'Lunch'}]},
+            format='json',
+        )
+
+        self.assertEqual(self.counts(), {'Dinner': 2, 'Spicy': 0, 'Lunch': 1})
+
+    def test_bulk_create_and_update(self):
+        """Test the bulk endpoint updates the counts."""
+        res = self.client.post(BULK_URL, [
+            {'title': 'A', 'time_minutes': 1, 'price': '1.00', 'tags': [{'name': 'Vegan'}]},
+            {'title': 'B', 'time_minutes': 1, 'price': '1.00', 'tags': [{'name': 'Vegan'}]},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.counts(), {'Vegan': 2})
+
+        recipe_id = res.data['results'][0]['id']
+        self.client.post(BULK_URL, [{'id': recipe_id, 'tags': []}], format='json')
+
+        self.assertEqual(self.counts(), {'Vegan': 1})
+
+    def test_m2m_add_remove_clear(self):
+        """Test related manager calls from both sides update the counts."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        recipe = create_recipe(self.user)
+        other = create_recipe(self.user)
+
+        recipe.tags.add(vegan, quick)
+        recipe.tags.add(vegan)
+        vegan.recipe_set.add(other)
+        self.assertEqual(self.counts(), {'Vegan': 2, 'Quick': 1})
+
+        other.tags.remove(quick)
+        recipe.tags.remove(quick)
+        self.assertEqual(self.counts(), {'Vegan': 2, 'Quick': 0})
+
+        vegan.recipe_set.clear()
+        self.assertEqual(self.counts(), {'Vegan': 0, 'Quick': 0})
+
+    def test_recipe_delete(self):
+        """Test deleting a recipe uncounts it."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(vegan)
+        create_recipe(self.user).tags.add(vegan)
+
+        recipe.delete()
+
+        self.assertEqual(self.counts(), {'Vegan': 1})
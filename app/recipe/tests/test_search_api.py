@@ -0,0 +1,112 @@
+"""Tests for full-text search of recipes."""
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SearchApiTests(TestCase):
+    """Test the q parameter of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, q):
+        res = self.client.get(RECIPE_URL, {'q': q})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test recipes are matched by words of the title or description."""
+        curry = create_recipe(self.user, title='Green curry')
+        soup = create_recipe(self.user, title='Soup', description='With curry paste')
+        create_recipe(self.user, title='Pancakes')
+
+        self.assertCountEqual(self.search('curry'), [curry.id, soup.id])
+
+    def test_search_all_words(self):
+        """Test every word of the query must match."""
+        curry = create_recipe(self.user, title='Green curry')
+        create_recipe(self.user, title='Red curry')
+
+        self.assertEqual(self.search('green curry'), [curry.id])
+
+    def test_search_tag_names(self):
+        """Test tag names are part of the searched document."""
+        recipe = create_recipe(self.user, title='Salad')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        self.assertEqual(self.search('vegan'), [recipe.id])
+
+        tag.name = 'Summer'
+        tag.save()
+        self.assertEqual(self.search('summer'), [recipe.id])
+
+        recipe.tags.clear()
+        self.assertEqual(self.search('summer'), [])
+
+    def test_search_follows_updates(self):
+        """Test search reflects a recipe's new title."""
+        recipe = create_recipe(self.user, title='Pancakes')
+        recipe.title = 'Waffles'
+        recipe.save()
+
+        self.assertEqual(self.search('pancakes'), [])
+        self.assertEqual(self.search('waffles'), [recipe.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        create_recipe(other, title='Green curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'ranking needs PostgreSQL')
+    def test_search_ranked(self):
+        """Test title matches rank above description matches."""
+        soup = create_recipe(self.user, title='Soup', description='With curry paste')
+        curry = create_recipe(self.user, title='Green curry')
+
+        self.assertEqual(self.search('curry'), [curry.id, soup.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'search documents need PostgreSQL')
+    def test_tag_rename_updates_documents_in_one_query(self):
+        """Test renaming a tag refreshes its recipes without reading them."""
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        curry = create_recipe(self.user, title='Green curry')
+        curry.tags.add(tag)
+        tag.name = 'Vegan'
+
+        with self.assertNumQueries(2):
+            tag.save()
+
+        self.assertEqual(self.search('vegan'), [curry.id])
@@ -77,6 +77,17 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name(self):
+        """Test renaming a tag to a name the user already has fails."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Vegan')
@@ -135,5 +146,40 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(len(res.data), 1)
 
+    def test_tags_with_counts(self):
+        """Test with_counts returns how many recipes use each tag."""
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price=Decimal('3.00'),
+            )
+            recipe.tags.add(breakfast)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1, 'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{'id': breakfast.id, 'name': 'Breakfast', 'recipe_count': 2}],
+        )
+
+    def test_tags_invalid_with_counts(self):
+        """Test a non 0/1 with_counts is a 400."""
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL, {'with_counts': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('with_counts', res.data)
+
+    def test_tags_invalid_assigned_only(self):
+        """Test a non 0/1 assigned_only is a 400, not a server error."""
+        Tag.objects.create(user=self.user, name='Breakfast')
 
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('assigned_only', res.data)
@@ -1,7 +1,9 @@
 """URL mappings for the recipe API."""
 
+from django.conf import settings
 from django.urls import path, include
 from recipe import views
+from recipe.async_views import async_urlpatterns
 from rest_framework.routers import DefaultRouter
 
 
@@ -13,6 +15,10 @@ router.register('ingredients', views.IngredientViewSet)
 
 app_name = 'recipe'
 
+router_urls = router.urls
+if settings.ASYNC_API:
+    router_urls = async_urlpatterns(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls))
-]
\ No newline at end of file
+    path('', include(router_urls))
+]
@@ -1,15 +1,31 @@
 """ """
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.urls import path
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
 
-from rest_framework.authentication import TokenAuthentication
 from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets, status
-from recipe import serializers
+from recipe import autocomplete, bulk, export, filters, search, serializers
+from core.replicas import ReplicaReadMixin
+from core.timing import ServerTimingMixin
+from recipe.async_views import AsyncReadMixin
+from recipe.cache import (
+    ConditionalGetMixin,
+    ConditionalRetrieveMixin,
+    VersionedListCacheMixin,
+)
+from user.authentication import CachedTokenAuthentication
+from recipe.pagination import RecipeCursorPagination
+from core.files import HashingUploadHandler
 from core.models import Recipe, Tag, Ingredient
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 app_name = 'recipe'
 
 @extend_schema_view(
@@ -23,42 +39,51 @@ app_name = 'recipe'
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separates list of ingredients IDs to filter',
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Return recipes with any (default) or all of the given IDs',
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Full-text search of titles, descriptions, tags '
+                            'and ingredients; results are ordered by relevance',
+            ),
         ]
     )
 )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, ReplicaReadMixin, ConditionalRetrieveMixin, VersionedListCacheMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """Manage recipes in the database."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers."""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeCursorPagination
+    cursor_ordering = None
 
     def get_queryset(self):
         """Return objects for the current authenticated user only."""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
+        match = filters.parse_match(params.get('match', filters.MATCH_ANY))
 
-        # parti dai recipe dell'utente
         queryset = self.queryset.filter(user=self.request.user)
 
-        # se 'tags' è presente, filtra
-        if tags:
-            tag_ids = self._params_to_ints(tags)  # converte '1,2,3' in [1, 2, 3]
-            queryset = queryset.filter(tags__id__in=tag_ids)
+        for field_name in ('tags', 'ingredients'):
+            if params.get(field_name):
+                ids = filters.parse_ids(field_name, params[field_name])
+                queryset = filters.filter_linked(queryset, field_name, ids, match)
 
-        # se 'ingredients' è presente, filtra
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        if params.get('q', '').strip():
+            # ranked searches are paginated by rank, then id
+            queryset, self.cursor_ordering = search.search_recipes(
+                queryset, params['q'],
+            )
 
-        # ordina come ti serve (per es. -id) in modo da corrispondere ai test
-        return queryset.order_by('-id')
+        ordering = self.cursor_ordering or ('-id',)
+        return queryset.order_by(*ordering).prefetch_related('tags', 'ingredients')
 
 
     def get_serializer_class(self):
@@ -75,9 +100,136 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe."""
         serializer.save()
 
+    @extend_schema(
+        request=serializers.RecipeSerializer(many=True),
+        parameters=[
+            OpenApiParameter(
+                'allow_partial',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Write the valid items even if others fail',
+            )
+        ],
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create or update many recipes in one request.
+
+        Items with an ``id`` update that recipe, the others are created.
+        By default nothing is written if any item is invalid. The status is
+        201 when a recipe was created, 200 when all items were updates and
+        207 when some items failed.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Expected a list of recipes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': f'At most {settings.RECIPE_BULK_MAX_ITEMS} '
+                           'recipes can be sent at once.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        allow_partial = filters.parse_flag(
+            'allow_partial', request.query_params.get('allow_partial', '0'),
+        )
+
+        ids = [
+            item['id'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('id'), int)
+        ]
+        existing = self.queryset.filter(user=request.user).in_bulk(ids)
+
+        valid, errors, seen = [], [], set()
+        for index, item in enumerate(items):
+            instance = None
+            if isinstance(item, dict) and item.get('id') is not None:
+                instance = existing.get(item['id'])
+                if instance is None:
+                    errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                    continue
+                if instance.id in seen:
+                    errors.append({'index': index, 'errors': {'id': ['Duplicate id.']}})
+                    continue
+                seen.add(instance.id)
+            serializer = serializers.RecipeSerializer(
+                instance,
+                data=item,
+                partial=instance is not None,
+                context=self.get_serializer_context(),
+            )
+            if serializer.is_valid():
+                valid.append((instance, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        if errors and not allow_partial:
+            return Response(
+                {'results': [], 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        recipes = bulk.write_recipes(request.user, valid) if valid else []
+        results = serializers.RecipeSerializer(recipes, many=True).data
+        if errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif any(instance is None for instance, data in valid):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(
+            {'results': results, 'errors': errors},
+            status=response_status,
+        )
+
+    @extend_schema(
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR,
+                   (200, 'text/csv'): OpenApiTypes.STR},
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=(export.NDJSONRenderer, export.CSVRenderer),
+    )
+    def export(self, request):
+        """Stream all recipes as NDJSON (default) or CSV (?format=csv).
+
+        Recipes are read with a server-side cursor and tags/ingredients are
+        prefetched per chunk, so memory stays flat for any account size.
+        Under ASGI the rows are handed to the server by an async iterator,
+        one chunk at a time.
+        """
+        recipes = self.get_queryset().iterator(
+            chunk_size=settings.RECIPE_EXPORT_CHUNK_SIZE,
+        )
+        serializer = serializers.RecipeDetailSerializer(
+            context=self.get_serializer_context(),
+        )
+        if request.accepted_renderer.format == 'csv':
+            rows = export.iter_csv(recipes, serializer)
+            filename = 'recipes.csv'
+        else:
+            rows = export.iter_ndjson(recipes, serializer)
+            filename = 'recipes.ndjson'
+        if isinstance(request._request, ASGIRequest):
+            rows = export.aiter_chunks(rows, settings.RECIPE_EXPORT_CHUNK_SIZE)
+
+        response = StreamingHttpResponse(
+            rows,
+            content_type=f'{request.accepted_renderer.media_type}; charset=utf-8',
+        )
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe."""
+        # hash the upload while it streams to disk, before the body is parsed
+        request._request.upload_handlers = [HashingUploadHandler(request._request)]
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -103,40 +255,117 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 name='assigned_only',
                 type=OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipe',
-            )
+            ),
+            OpenApiParameter(
+                name='with_counts',
+                type=OpenApiTypes.INT, enum=[0, 1],
+                description='Include the number of recipes using each item',
+            ),
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,mixins.UpdateModelMixin,mixins.ListModelMixin, viewsets.GenericViewSet):
+class BaseRecipeAttrViewSet(ReplicaReadMixin, ConditionalGetMixin, VersionedListCacheMixin, AsyncReadMixin,mixins.DestroyModelMixin,mixins.UpdateModelMixin,mixins.ListModelMixin, viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    recipe_field = None  # the Recipe M2M field linking to these items
+    count_serializer_class = None
+
+    @property
+    def with_counts(self):
+        return filters.parse_flag(
+            'with_counts', self.request.query_params.get('with_counts', '0'),
+        )
+
     def get_queryset(self):
         """Return objects for the current authenticated user only."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
+        assigned_only = filters.parse_flag(
+            'assigned_only', self.request.query_params.get('assigned_only', '0'),
         )
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False).distinct()
+            through, source, target = bulk.recipe_through(self.recipe_field)
+            queryset = queryset.filter(
+                Exists(through.objects.filter(**{target: OuterRef('pk')}))
+            )
 
-        return queryset.filter(user=self.request.user).order_by('-name')
+        return queryset.order_by('-name')
 
+    def get_serializer_class(self):
+        """Return the serializer with counts when they are requested."""
+        if self.with_counts or self.action == 'autocomplete':
+            return self.count_serializer_class
+        return self.serializer_class
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'prefix', OpenApiTypes.STR, required=True,
+                description='Case-insensitive start of the name',
+            ),
+            OpenApiParameter(
+                'limit', OpenApiTypes.INT,
+                description='Number of results, at most AUTOCOMPLETE_MAX_LIMIT',
+            ),
+        ],
+    )
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return items whose name starts with ``prefix``, most used first."""
+        prefix = request.query_params.get('prefix', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.AUTOCOMPLETE_MAX_LIMIT:
+            raise ValidationError({'limit': [
+                f'Expected a number from 1 to {settings.AUTOCOMPLETE_MAX_LIMIT}.'
+            ]})
+
+        results = []
+        if prefix:
+            results = autocomplete.complete(
+                self.queryset.model,
+                request.user,
+                self.get_data_version(),
+                prefix,
+                limit,
+            )
+        return Response(self.get_serializer(results, many=True).data)
+
+    def perform_update(self, serializer):
+        """Save the item, rejecting names the user already has."""
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'name': ['You already have one with this name.']})
+
+@extend_schema_view(
+    autocomplete=extend_schema(responses=serializers.TagCountSerializer(many=True)),
+)
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 
 
 
 
+@extend_schema_view(
+    autocomplete=extend_schema(responses=serializers.IngredientCountSerializer(many=True)),
+)
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
     queryset = Ingredient.objects.all()
+    recipe_field = 'ingredients'
 
 
 
@@ -0,0 +1,102 @@
+"""Token authentication with cached token to user resolution."""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+local_tokens = LRUCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE,
+    ttl=settings.TOKEN_CACHE_LOCAL_TTL,
+)
+
+
+def _cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}'
+
+
+def _revoked_key(cache_key):
+    return f'{cache_key}:revoked'
+
+
+def invalidate_token(key):
+    """Stop every process from using its cached copy of a token.
+
+    The token's revocation marker in the shared cache changes, which the
+    cached entries of every process are checked against on each use. The
+    marker outlives any entry that could predate it.
+    """
+    cache_key = _cache_key(key)
+    local_tokens.delete(cache_key)
+    shared = caches[settings.TOKEN_CACHE_ALIAS]
+    shared.set(
+        _revoked_key(cache_key),
+        time.time_ns(),
+        settings.TOKEN_CACHE_TTL + settings.TOKEN_CACHE_LOCAL_TTL,
+    )
+    shared.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    """Invalidate every token of a user.
+
+    Runs when a user is saved or deactivated with QuerySet.update().
+    """
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that caches the token lookup.
+
+    Tokens are looked up in this process first, then in the shared cache,
+    and only then in the database. Each entry remembers the token's
+    revocation marker, and a local hit costs one shared cache get to check
+    it, so deleting a token or saving its user applies to all processes at
+    once.
+
+    Entries hold only the user's id and is_active flag. Every request gets
+    its own user instance with the other fields deferred: they are loaded
+    one by one on first access, so views needing the user's data should
+    fetch the user instead.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        revoked_key = _revoked_key(cache_key)
+        shared = caches[settings.TOKEN_CACHE_ALIAS]
+
+        entry = local_tokens.get(cache_key)
+        if entry is not None and shared.get(revoked_key) != entry[0]:
+            local_tokens.delete(cache_key)
+            entry = None
+        if entry is None:
+            values = shared.get_many([cache_key, revoked_key])
+            revoked = values.get(revoked_key)
+            entry = values.get(cache_key)
+            if entry is None or entry[0] != revoked:
+                # the user was just loaded for this request; only the
+                # entry is cached
+                user, token = super().authenticate_credentials(key)
+                entry = (revoked, user.pk, user.is_active)
+                shared.set(cache_key, entry, settings.TOKEN_CACHE_TTL)
+                local_tokens.set(cache_key, entry)
+                return (user, token)
+            local_tokens.set(cache_key, entry)
+
+        revoked, user_id, is_active = entry
+        if not is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        user = get_user_model().from_db(None, ['id', 'is_active'], [user_id, is_active])
+        token = Token.from_db(None, ['key', 'user_id'], [key, user_id])
+        token.user = user
+        return (user, token)
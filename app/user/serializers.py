@@ -3,6 +3,8 @@ from django.contrib.auth import (get_user_model, authenticate)
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from core import hashing
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object."""
     class Meta:
@@ -14,6 +16,10 @@ class UserSerializer(serializers.ModelSerializer):
         """Create a new user with encrypted password and return it."""
         return get_user_model().objects.create_user(**validated_data)
 
+    async def acreate(self, validated_data):
+        """Async create() for the ASGI view."""
+        return await get_user_model().objects.acreate_user(**validated_data)
+
     def update(self, instance, validated_data):
         """Update a user, setting the password correctly and return it."""
         password:str = validated_data.pop('password', None)
@@ -47,6 +53,44 @@ class AuthTokenSerializer(serializers.Serializer):
             username=email,
             password=password
         )
+        return self._authenticated(attrs, user)
+
+    async def avalidate(self, attrs):
+        """Async validate() that awaits the password check.
+
+        ModelBackend.aauthenticate() hashes inline for unknown emails, so
+        the user is looked up here and the dummy hash is awaited too.
+        """
+        user_model = get_user_model()
+        try:
+            user = await user_model._default_manager.aget_by_natural_key(
+                attrs.get('email'),
+            )
+        except user_model.DoesNotExist:
+            # hash anyway so unknown emails take as long as known ones
+            await hashing.amake_password(attrs.get('password'))
+            user = None
+        else:
+            if not (await user.acheck_password(attrs.get('password')) and user.is_active):
+                user = None
+        return self._authenticated(attrs, user)
+
+    async def ais_valid(self, *, raise_exception=False):
+        """Async is_valid(), running avalidate() after the field checks."""
+        try:
+            attrs = self.to_internal_value(self.initial_data)
+            self._validated_data = await self.avalidate(attrs)
+        except serializers.ValidationError as exc:
+            self._validated_data = {}
+            self._errors = serializers.as_serializer_error(exc)
+        else:
+            self._errors = {}
+
+        if self._errors and raise_exception:
+            raise serializers.ValidationError(self.errors)
+        return not self._errors
+
+    def _authenticated(self, attrs, user):
         if not user:
             msg = _('Unable to authenticate with provided credentials.')
             raise serializers.ValidationError(msg, code='authentication')
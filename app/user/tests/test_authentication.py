@@ -0,0 +1,151 @@
+"""Tests for cached token authentication."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    CachedTokenAuthentication,
+    _cache_key,
+    local_tokens,
+)
+
+ME_URL = reverse('user:me')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token resolution is cached and invalidated."""
+
+    def setUp(self):
+        local_tokens.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_token_query(self):
+        """Test only the first request looks the token up."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_shared_cache_used_by_other_processes(self):
+        """Test a cold local cache falls back to the shared cache."""
+        self.client.get(ME_URL)
+        local_tokens.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working immediately."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user stops their cached token working."""
+        self.client.get(RECIPE_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_reloads_user(self):
+        """Test a password change drops the cached user."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def _hold_local_entry(self):
+        """Return a function putting back this process's current entry.
+
+        It stands in for another process that cached the token earlier and
+        did not run the invalidating signal handler itself.
+        """
+        cache_key = _cache_key(self.token.key)
+        entry = local_tokens.get(cache_key)
+        self.assertIsNotNone(entry)
+        return lambda: local_tokens.set(cache_key, entry)
+
+    def test_deleted_token_rejected_by_other_processes(self):
+        """Test a token deleted elsewhere stops working without waiting."""
+        self.client.get(ME_URL)
+        restore = self._hold_local_entry()
+        self.token.delete()
+        restore()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_deactivation_rejected(self):
+        """Test users deactivated with update() are rejected everywhere."""
+        self.client.get(RECIPE_URL)
+        restore = self._hold_local_entry()
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        restore()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_inactive_user_rejected(self):
+        """Test a cached token of an inactive user is not accepted."""
+        self.client.get(ME_URL)
+        cache_key = _cache_key(self.token.key)
+        revoked, user_id, is_active = local_tokens.get(cache_key)
+        local_tokens.set(cache_key, (revoked, user_id, False))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_holds_no_user_data(self):
+        """Test cached entries keep only the user id and active flag."""
+        self.client.get(ME_URL)
+
+        entry = cache.get(_cache_key(self.token.key))
+
+        self.assertEqual(entry[1:], (self.user.pk, True))
+
+    def test_each_request_gets_its_own_user(self):
+        """Test requests do not share one cached user instance."""
+        auth = CachedTokenAuthentication()
+
+        first, token = auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            second, token = auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.pk, self.user.pk)
+        self.assertIs(token.user, second)
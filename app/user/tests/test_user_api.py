@@ -1,15 +1,27 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 from rest_framework import status
 
+from core import hashing
+from core.tests.utils import QueryBudgetMixin
+from user.serializers import AuthTokenSerializer
+
 CREATE_USER_URL =  reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
 
+# token lookup only; the profile is the authenticated user itself
+ME_BUDGET = 1
+
 def create_user(**params):
     """create and return a new user."""
     return get_user_model().objects.create_user(**params)
@@ -100,7 +112,7 @@ class PublicUserApiTEsts(TestCase):
         res = self.client.get(ME_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateUserApiTests(TestCase):
+class PrivateUserApiTests(QueryBudgetMixin, TestCase):
     """Test API requests that require authentication."""
     def setUp(self):
         self.user = create_user(email='test@example.com', password='testpass123', name='Test Name')
@@ -133,6 +145,112 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         
 
+    def test_me_query_budget(self):
+        """Test retrieving the profile stays within its query budget."""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        with self.assertQueryBudget(ME_BUDGET):
+            res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class PasswordHashingTests(TestCase):
+    """Test password hashing on the bounded pool."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'test@example.com', 'password': 'testpass123'}
+
+    def tearDown(self):
+        cache.delete(hashing.PENDING_KEY)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_register_and_login_in_pool(self):
+        """Test passwords hashed in a worker process still log in."""
+        res = self.client.post(CREATE_USER_URL, {**self.payload, 'name': 'Test'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    @patch('core.hashing.ProcessPoolExecutor')
+    def test_pool_not_forked(self, patched_pool):
+        """Test pool workers are not forked from the threaded app process."""
+        with patch.object(hashing, '_pool', None):
+            hashing._get_pool()
+
+        context = patched_pool.call_args.kwargs['mp_context']
+        self.assertIn(context.get_start_method(), ('forkserver', 'spawn'))
+
+    @override_settings(PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_RETRY_AFTER=3)
+    def test_login_rejected_when_queue_full(self):
+        """Test a login is refused with 503 when no hash slot is free."""
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '3')
+
+    @override_settings(PASSWORD_HASH_MAX_CONCURRENT=1)
+    def test_register_rejected_over_shared_limit(self):
+        """Test the shared limit counts hashes in other processes."""
+        cache.set(hashing.PENDING_KEY, 1)
+        res = self.client.post(CREATE_USER_URL, {**self.payload, 'name': 'Test'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertEqual(cache.get(hashing.PENDING_KEY), 1)
+
+        cache.set(hashing.PENDING_KEY, 0)
+        res = self.client.post(CREATE_USER_URL, {**self.payload, 'name': 'Test'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(cache.get(hashing.PENDING_KEY), 0)
+
+    @override_settings(PASSWORD_HASH_MAX_CONCURRENT=2)
+    @patch('django.core.cache.backends.locmem.time.time')
+    def test_shared_count_outlives_first_hash(self, patched_time):
+        """Test each admitted hash keeps the shared count from expiring."""
+        patched_time.return_value = 1000
+        with hashing._admitted():
+            patched_time.return_value += hashing.PENDING_TIMEOUT - 10
+            with hashing._admitted():
+                # past the expiry set when the key was first added
+                patched_time.return_value += 20
+                with self.assertRaises(hashing.PasswordHashingBusy):
+                    with hashing._admitted():
+                        pass
+
+        self.assertEqual(cache.get(hashing.PENDING_KEY), 0)
+
+    @override_settings(PASSWORD_HASH_MAX_CONCURRENT=1)
+    def test_shared_count_expired_mid_hash(self):
+        """Test a count that expired during a hash never goes negative."""
+        with hashing._admitted():
+            cache.delete(hashing.PENDING_KEY)
+            with hashing._admitted():
+                pass
+
+        self.assertEqual(cache.get(hashing.PENDING_KEY), 0)
+        with hashing._admitted():
+            with self.assertRaises(hashing.PasswordHashingBusy):
+                with hashing._admitted():
+                    pass
+
+    def test_async_login(self):
+        """Test the async serializer path authenticates and rejects."""
+        create_user(**self.payload)
 
+        serializer = AuthTokenSerializer(data=self.payload)
+        self.assertTrue(async_to_sync(serializer.ais_valid)())
+        self.assertEqual(serializer.validated_data['user'].email, self.payload['email'])
 
+        serializer = AuthTokenSerializer(data={**self.payload, 'password': 'wrong'})
+        self.assertFalse(async_to_sync(serializer.ais_valid)())
+        self.assertIn('non_field_errors', serializer.errors)
 
+        serializer = AuthTokenSerializer(data={**self.payload, 'email': 'no@example.com'})
+        self.assertFalse(async_to_sync(serializer.ais_valid)())
@@ -1,11 +1,15 @@
 """URL mappings for the user API."""
+from django.conf import settings
 from django.urls import path
 from user import views
 
 app_name = 'user'
 
+# under ASGI, sign-up and login await the password hash
+as_view = 'as_async_view' if settings.ASYNC_API else 'as_view'
+
 urlpatterns = [
-    path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('create/', getattr(views.CreateUserView, as_view)(), name='create'),
+    path('token/', getattr(views.CreateTokenView, as_view)(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
\ No newline at end of file
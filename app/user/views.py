@@ -1,27 +1,97 @@
 """views for the user API."""
-from rest_framework import generics, authentication, permissions
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+
+from core.timing import ServerTimingMixin
+from user.authentication import CachedTokenAuthentication
 from user.serializers import (UserSerializer, AuthTokenSerializer)
 
-class CreateUserView(generics.CreateAPIView):
+
+class AsyncPostMixin:
+    """Serve POST with a coroutine when ``ASYNC_API`` is on.
+
+    Under ASGI every sync view shares one thread, so a login waiting for
+    its password hash there would hold up the rest of the API; the async
+    handler awaits the hash instead.
+    """
+
+    @classmethod
+    def as_async_view(cls, **initkwargs):
+        """Return an async view that handles POST with ``apost()``."""
+        sync_view = cls.as_view(**initkwargs)
+
+        async def view(request, *args, **kwargs):
+            if request.method != 'POST':
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of APIView.dispatch() for POST."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.apost(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class CreateUserView(ServerTimingMixin, AsyncPostMixin, generics.CreateAPIView):
     """create a new user in the system."""
     serializer_class = UserSerializer
 
-class CreateTokenView(ObtainAuthToken):
+    async def apost(self, request, *args, **kwargs):
+        """Async counterpart of CreateModelMixin.create()."""
+        serializer = self.get_serializer(data=request.data)
+        # the field checks query for an existing email
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        serializer.instance = await serializer.acreate(serializer.validated_data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class CreateTokenView(ServerTimingMixin, AsyncPostMixin, ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+    async def apost(self, request, *args, **kwargs):
+        """Async counterpart of ObtainAuthToken.post()."""
+        serializer = self.get_serializer(data=request.data)
+        await serializer.ais_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = await Token.objects.aget_or_create(user=user)
+        return Response({'token': token.key})
+
+class ManageUserView(ServerTimingMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authenticated user."""
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            # authenticated from the token cache with only its id loaded
+            user = get_user_model().objects.get(pk=user.pk)
+        return user
 
 
 
@@ -0,0 +1,20 @@
+server {
+    listen ${LISTEN_PORT};
+    location /static {
+        alias /vol/static;
+    }
+    # recipe images are named by their content hash and never change
+    location /static/media/uploads/recipe/ {
+        alias   /vol/static/media/uploads/recipe/;
+        expires max;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+    location / {
+        proxy_pass           http://${APP_HOST}:${APP_PORT};
+        proxy_set_header     Host $host;
+        proxy_set_header     X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header     X-Forwarded-Proto $scheme;
+        client_max_body_size 10M;
+
+    }
+}
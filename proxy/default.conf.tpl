@@ -3,6 +3,12 @@ server {
     location /static {
         alias /vol/static;
     }
+    # recipe images are named by their content hash and never change
+    location /static/media/uploads/recipe/ {
+        alias   /vol/static/media/uploads/recipe/;
+        expires max;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
     location / {
         uwsgi_pass           ${APP_HOST}:${APP_PORT};
         include              /etc/nginx/uwsgi_params;
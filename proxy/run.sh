@@ -2,5 +2,10 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+# the app speaks HTTP instead of uwsgi when it is served over ASGI
+if [ "$SERVER_MODE" = "asgi" ]; then
+    envsubst < /etc/nginx/asgi.conf.tpl > /etc/nginx/conf.d/default.conf
+else
+    envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+fi
+nginx -g 'daemon off;'
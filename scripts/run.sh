@@ -1,7 +1,14 @@
 #!/bin/sh
 
 set -e
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# waits for the database; migrate/collectstatic run only when needed
+python manage.py startup
+
+# SERVER_MODE=asgi serves the API with async views under uvicorn
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec uvicorn app.asgi:application --host 0.0.0.0 --port 9000 --workers 4
+fi
+# workers are recycled now and then; each opens its own connections after
+# forking and closes them on exit
+uwsgi --socket :9000 --workers 4 --master --enable-threads \
+    --max-requests 5000 --max-requests-delta 500 --module app.wsgi